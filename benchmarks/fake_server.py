@@ -0,0 +1,308 @@
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from benchmarks.synthetic_data import SyntheticDataset
+
+DEFAULT_PORT = 8080
+DEFAULT_NB_TICKETS = 10_000
+DEFAULT_NB_CYCLES = 50
+DEFAULT_NB_UNCOMPLETED_ISSUES = 10
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+
+NOTION_MAX_BLOCKS_PER_REQUEST = 100
+NOTION_MAX_PAGE_SIZE = 100
+
+_ROOT_FIELD_PATTERN = re.compile(r'(?:(\w+)\s*:\s*)?\b(issues|cycles|cycle)\s*\(')
+
+
+class FakeBackend:
+    """In-memory Linear and Notion data served by the fake server."""
+
+    def __init__(self, nb_tickets: int, nb_cycles: int, seed: int = 0,
+                 nb_uncompleted_issues: int = DEFAULT_NB_UNCOMPLETED_ISSUES):
+        dataset = SyntheticDataset(seed=seed)
+        self._issues = dataset.issue_nodes(nb_tickets=nb_tickets)
+        self._bugs = [issue for issue in self._issues
+                      if any(label['name'] == 'Bug' for label in issue['labels']['nodes'])]
+        self._issues_by_update = sorted(self._issues, key=lambda issue: issue['updatedAt'])
+        self._cycles = dataset.cycle_nodes(nb_cycles=nb_cycles, nb_uncompleted_issues=nb_uncompleted_issues)
+        self._cycles_per_id = {cycle['id']: cycle for cycle in self._cycles}
+        self._pages_per_database: Dict[str, list[Dict]] = {}
+        self._database_per_page: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def graphql(self, payload: Dict) -> Dict:
+        query = payload['query']
+        variables = payload.get('variables') or {}
+        data = {}
+        for match in _ROOT_FIELD_PATTERN.finditer(query):
+            alias, root_field = match.group(1), match.group(2)
+            prefix = f"{alias}_" if alias is not None and query.startswith('query Batch') else ''
+            operation_variables = {name[len(prefix):]: value for name, value in variables.items()
+                                   if name.startswith(prefix)}
+            operation_query = query[match.end():]
+            if root_field == 'cycles':
+                data[alias or root_field] = self._cycle_page(query=operation_query, variables=operation_variables)
+            elif root_field == 'cycle':
+                cycle = self._cycles_per_id.get(operation_variables['cycleId'])
+                data[alias or root_field] = None if cycle is None else {
+                    'uncompletedIssuesUponClose': self._page(items=cycle['uncompletedIssuesUponClose']['nodes'],
+                                                             first=operation_variables['first'],
+                                                             after=operation_variables.get('after'))
+                }
+            else:
+                data[alias or root_field] = self._issue_page(query=operation_query, variables=operation_variables)
+        return {'data': data}
+
+    def create_page(self, payload: Dict) -> Optional[Dict]:
+        if len(payload.get('children', [])) > NOTION_MAX_BLOCKS_PER_REQUEST:
+            return None
+        page = {'id': str(uuid.uuid4()), 'properties': payload.get('properties', {})}
+        database_id = payload['parent']['database_id']
+        with self._lock:
+            self._pages_per_database.setdefault(database_id, []).append(page)
+            self._database_per_page[page['id']] = database_id
+        return {'object': 'page', 'id': page['id']}
+
+    def append_blocks(self, block_id: str, payload: Dict) -> Optional[Dict]:
+        if len(payload.get('children', [])) > NOTION_MAX_BLOCKS_PER_REQUEST or block_id not in self._database_per_page:
+            return None
+        return {'object': 'list', 'results': []}
+
+    def query_database(self, database_id: str, payload: Dict) -> Dict:
+        page_filter = payload.get('filter') or {}
+        with self._lock:
+            pages = [page for page in self._pages_per_database.get(database_id, [])
+                     if self._match(page=page, page_filter=page_filter)]
+
+        start = int(payload.get('start_cursor') or 0)
+        end = start + min(int(payload.get('page_size', NOTION_MAX_PAGE_SIZE)), NOTION_MAX_PAGE_SIZE)
+        return {
+            'object': 'list',
+            'results': [{'id': page['id'], 'properties': {
+                'Name': {'title': self._plain_texts(page=page, property_name='Name', property_type='title')},
+                'Cycle': {'rich_text': self._plain_texts(page=page, property_name='Cycle', property_type='rich_text')}
+            }} for page in pages[start:end]],
+            'has_more': end < len(pages),
+            'next_cursor': str(end) if end < len(pages) else None
+        }
+
+    def _issue_page(self, query: str, variables: Dict) -> Dict:
+        if 'updatedAfter' in variables:
+            issues = [issue for issue in self._issues_by_update if issue['updatedAt'] > variables['updatedAfter']]
+        elif '"Bug"' in query[:query.find('nodes')]:
+            issues = self._bugs
+        else:
+            issues = self._issues
+        if 'createdBefore' in variables:
+            created_before = datetime.fromisoformat(variables['createdBefore'])
+            issues = [issue for issue in issues if datetime.fromisoformat(issue['createdAt']) < created_before]
+
+        page = self._page(items=issues, first=variables['first'], after=variables.get('after'))
+        team_key = variables.get('teamKey')
+        if team_key is not None:
+            # every team is served the same issues, under ids and identifiers of its own as on Linear
+            numbers = [issue['identifier'].rsplit('-', 1)[1] for issue in page['nodes']]
+            page['nodes'] = [issue | {'id': f"{team_key.lower()}-issue-{number}", 'identifier': f"{team_key}-{number}"}
+                             for issue, number in zip(page['nodes'], numbers)]
+        return page
+
+    def _cycle_page(self, query: str, variables: Dict) -> Dict:
+        cycles = [cycle for cycle in self._cycles if cycle['number'] > variables.get('afterNumber', float('-inf'))]
+        page = self._page(items=cycles, first=variables.get('first', len(cycles)), after=variables.get('after'))
+        if 'scopeHistory' not in query:
+            page['nodes'] = [{'number': cycle['number'], 'name': cycle['name']} for cycle in page['nodes']]
+        elif 'issuesFirst' in variables:
+            page['nodes'] = [cycle | {'uncompletedIssuesUponClose': self._page(
+                items=cycle['uncompletedIssuesUponClose']['nodes'], first=variables['issuesFirst'], after=None)}
+                for cycle in page['nodes']]
+        return page
+
+    @staticmethod
+    def _page(items: list, first: int, after: Optional[str]) -> Dict:
+        start = int(after or 0)
+        end = start + int(first)
+        return {
+            'pageInfo': {'hasNextPage': end < len(items), 'endCursor': str(min(end, len(items)))},
+            'nodes': items[start:end]
+        }
+
+    @staticmethod
+    def _plain_texts(page: Dict, property_name: str, property_type: str) -> list[Dict]:
+        texts = page['properties'].get(property_name, {}).get(property_type, [])
+        return [{'plain_text': text['text']['content']} for text in texts]
+
+    @staticmethod
+    def _match(page: Dict, page_filter: Dict) -> bool:
+        if 'and' in page_filter:
+            return all(FakeBackend._match(page=page, page_filter=sub_filter) for sub_filter in page_filter['and'])
+        property_type = next((name for name in ('rich_text', 'title') if name in page_filter), None)
+        if property_type is None:
+            return True
+
+        condition = page_filter[property_type]
+        value = "".join(text['plain_text'] for text in FakeBackend._plain_texts(
+            page=page, property_name=page_filter['property'], property_type=property_type))
+        if 'equals' in condition:
+            return value == condition['equals']
+        if 'starts_with' in condition:
+            return value.startswith(condition['starts_with'])
+        if condition.get('is_not_empty'):
+            return value != ''
+        return True
+
+
+class FaultInjection:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after_seconds: float = DEFAULT_RETRY_AFTER_SECONDS,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_seconds = retry_after_seconds
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self) -> None:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def draw(self) -> Optional[int]:
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503
+        return None
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], backend: FakeBackend, faults: FaultInjection):
+        super().__init__(address, FakeRequestHandler)
+        self.backend = backend
+        self.faults = faults
+        self.statistics = Counter()
+        self._statistics_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, route: str, status: int) -> None:
+        with self._statistics_lock:
+            self.statistics[(route, status)] += 1
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    server: FakeServer
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        self._handle(method='POST')
+
+    def do_PATCH(self) -> None:
+        self._handle(method='PATCH')
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug(format, *args)
+
+    def _handle(self, method: str) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        route, response = self._route(method=method, payload=payload)
+        if route is None:
+            return self._respond(route='unknown', status=404, body={'message': 'not found'})
+
+        self.server.faults.delay()
+        status = self.server.faults.draw()
+        if status == 429:
+            return self._respond(route=route, status=429, body={'message': 'rate limited'},
+                                 headers={'Retry-After': str(self.server.faults.retry_after_seconds)})
+        if status is not None:
+            return self._respond(route=route, status=status, body={'message': 'injected error'})
+
+        response = response()
+        if response is None:
+            return self._respond(route=route, status=400, body={'message': 'validation error'})
+        self._respond(route=route, status=200, body=response)
+
+    def _route(self, method: str, payload: Dict):
+        backend = self.server.backend
+        parts = self.path.strip('/').split('/')
+        if method == 'POST' and parts == ['graphql']:
+            return 'linear', lambda: backend.graphql(payload=payload)
+        if method == 'POST' and parts == ['v1', 'pages']:
+            return 'notion_pages', lambda: backend.create_page(payload=payload)
+        if method == 'PATCH' and len(parts) == 4 and parts[:2] == ['v1', 'blocks'] and parts[3] == 'children':
+            return 'notion_blocks', lambda: backend.append_blocks(block_id=parts[2], payload=payload)
+        if method == 'POST' and len(parts) == 4 and parts[:2] == ['v1', 'databases'] and parts[3] == 'query':
+            return 'notion_databases', lambda: backend.query_database(database_id=parts[2], payload=payload)
+        return None, None
+
+    def _respond(self, route: str, status: int, body: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        self.server.record(route=route, status=status)
+        encoded_body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded_body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in of the Linear and Notion APIs, for load testing")
+    parser.add_argument('--host', dest='host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', dest='port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--nb-tickets', dest='nb_tickets', type=int, default=DEFAULT_NB_TICKETS)
+    parser.add_argument('--nb-cycles', dest='nb_cycles', type=int, default=DEFAULT_NB_CYCLES)
+    parser.add_argument('--nb-uncompleted-issues', dest='nb_uncompleted_issues', type=int,
+                        default=DEFAULT_NB_UNCOMPLETED_ISSUES, help='number of uncompleted issues of every cycle')
+    parser.add_argument('--seed', dest='seed', type=int, default=0)
+    parser.add_argument('--latency-ms', dest='latency_ms', type=float, default=0.0,
+                        help='delay added to every response')
+    parser.add_argument('--jitter-ms', dest='jitter_ms', type=float, default=0.0,
+                        help='max random deviation of the delay')
+    parser.add_argument('--error-rate', dest='error_rate', type=float, default=0.0,
+                        help='ratio of the requests answered with a 503')
+    parser.add_argument('--rate-limit-rate', dest='rate_limit_rate', type=float, default=0.0,
+                        help='ratio of the requests answered with a 429 and a Retry-After header')
+    parser.add_argument('--retry-after', dest='retry_after_seconds', type=float, default=DEFAULT_RETRY_AFTER_SECONDS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeServer(address=(args.host, args.port),
+                        backend=FakeBackend(nb_tickets=args.nb_tickets, nb_cycles=args.nb_cycles, seed=args.seed,
+                                            nb_uncompleted_issues=args.nb_uncompleted_issues),
+                        faults=FaultInjection(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                              error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                                              retry_after_seconds=args.retry_after_seconds, seed=args.seed))
+    logging.info(f"Linear: {server.url}/graphql, Notion: {server.url}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for (route, status), count in sorted(server.statistics.items()):
+            logging.info(f"{route} {status}: {count} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, Optional
+
+from benchmarks.synthetic_data import SyntheticDataset
+from src.analysis_service.bug_analysis_service import BugAnalysisService
+from src.analysis_service.ticket_aggregator import (DESCRIPTION_DIMENSION, STATUS_DIMENSION, TYPE_DIMENSION,
+                                                     TicketAggregator)
+from src.json_stream import decode_items
+from src.linear.records import Cycle, Ticket
+from src.notion.cycle_analysis_page_builder import CycleAnalysisPageBuilder
+from src.notion.last_bug_analysis_page_builder import LastBugAnalysisPageBuilder
+from src.notion.last_ticket_analysis_page_builder import LastTicketAnalysisPageBuilder
+
+DEFAULT_TICKET_SIZES = [100, 1_000, 10_000, 100_000]
+DEFAULT_CYCLE_SIZES = [10, 100, 500]
+DEFAULT_REPEAT = 3
+
+DATABASE_ID = "benchmark"
+TEAM_KEY = "ABC"
+INSPECTION_DATE = datetime.now(tz=UTC)
+
+
+class BenchmarkResult:
+    __slots__ = ('name', 'size', 'best_seconds', 'peak_bytes', 'retained_blocks')
+
+    def __init__(self, name: str, size: int, best_seconds: float, peak_bytes: int, retained_blocks: int):
+        self.name = name
+        self.size = size
+        self.best_seconds = best_seconds
+        self.peak_bytes = peak_bytes
+        self.retained_blocks = retained_blocks
+
+    @property
+    def throughput(self) -> float:
+        return self.size / self.best_seconds if self.best_seconds > 0 else float('inf')
+
+    def to_json(self) -> Dict:
+        return {
+            "name": self.name,
+            "size": self.size,
+            "best_seconds": self.best_seconds,
+            "throughput_per_second": self.throughput,
+            "peak_bytes": self.peak_bytes,
+            "retained_blocks": self.retained_blocks
+        }
+
+
+def measure(name: str, size: int, func: Callable[[], Any], repeat: int) -> BenchmarkResult:
+    """Best wall time over `repeat` runs, then one run under tracemalloc for the peak memory.
+
+    The retained blocks are the blocks still allocated by the interpreter after a run, i.e. what the result keeps
+    alive; the blocks allocated then freed during the run are not counted.
+    """
+    best_seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    result = func()
+    retained_blocks = sys.getallocatedblocks() - blocks_before
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(name=name, size=size, best_seconds=best_seconds, peak_bytes=peak_bytes,
+                           retained_blocks=retained_blocks)
+
+
+def ticket_benchmarks(dataset: SyntheticDataset, nb_tickets: int, repeat: int) -> list[BenchmarkResult]:
+    nodes = dataset.issue_nodes(nb_tickets=nb_tickets)
+    body = json.dumps({"data": {"issues": {"pageInfo": {"hasNextPage": False, "endCursor": None},
+                                           "nodes": nodes}}}).encode()
+    del nodes
+    tickets, _ = decode_items(body=body, items_path=['data', 'issues', 'nodes'],
+                              item_factory=Ticket.from_json)
+    bugs = [ticket for ticket in tickets if ticket.is_bug]
+
+    aggregator = TicketAggregator(dimensions=[STATUS_DIMENSION, DESCRIPTION_DIMENSION, TYPE_DIMENSION]).add(tickets)
+    bug_aggregator = TicketAggregator(dimensions=[STATUS_DIMENSION]).add(bugs)
+    timedelta = BugAnalysisService._compute_timedelta(tickets=bugs)
+
+    def build_ticket_payload() -> Dict:
+        return LastTicketAnalysisPageBuilder(
+            database_id=DATABASE_ID, team_key=TEAM_KEY, inspection_date=INSPECTION_DATE,
+            nb_tickets=aggregator.nb_tickets,
+            tickets_per_description=aggregator.buckets(DESCRIPTION_DIMENSION),
+            tickets_per_status=aggregator.buckets(STATUS_DIMENSION),
+            tickets_per_type=aggregator.buckets(TYPE_DIMENSION)).build()
+
+    def build_bug_payload() -> Dict:
+        return LastBugAnalysisPageBuilder(
+            database_id=DATABASE_ID, team_key=TEAM_KEY, inspection_date=INSPECTION_DATE,
+            nb_tickets=bug_aggregator.nb_tickets, tickets_per_status=bug_aggregator.buckets(STATUS_DIMENSION),
+            timedelta=timedelta, last_10_tickets=bugs[:10]).build()
+
+    ticket_payload = build_ticket_payload()
+    bug_payload = build_bug_payload()
+    return [
+        measure(name="issue decoding", size=nb_tickets, repeat=repeat,
+                func=lambda: decode_items(body=body, items_path=['data', 'issues', 'nodes'],
+                                          item_factory=Ticket.from_json)),
+        measure(name="ticket bucketing", size=nb_tickets, repeat=repeat,
+                func=lambda: TicketAggregator(
+                    dimensions=[STATUS_DIMENSION, DESCRIPTION_DIMENSION, TYPE_DIMENSION]).add(tickets)),
+        measure(name="bug resolution times", size=len(bugs), repeat=repeat,
+                func=lambda: BugAnalysisService._compute_timedelta(tickets=bugs)),
+        measure(name="ticket page build", size=nb_tickets, repeat=repeat, func=build_ticket_payload),
+        measure(name="bug page build", size=len(bugs), repeat=repeat, func=build_bug_payload),
+        measure(name="ticket payload serialization", size=nb_tickets, repeat=repeat,
+                func=lambda: json.dumps(ticket_payload)),
+        measure(name="bug payload serialization", size=len(bugs), repeat=repeat,
+                func=lambda: json.dumps(bug_payload))
+    ]
+
+
+def cycle_benchmarks(dataset: SyntheticDataset, nb_cycles: int, repeat: int) -> list[BenchmarkResult]:
+    cycles = [Cycle.from_json(node) for node in dataset.cycle_nodes(nb_cycles=nb_cycles)]
+
+    def build_cycle_payloads() -> list[Dict]:
+        return [CycleAnalysisPageBuilder(database_id=DATABASE_ID, team_key=TEAM_KEY, inspection_date=INSPECTION_DATE,
+                                         cycle_name=cycle.name, cycle_data=cycle).build()
+                for cycle in cycles]
+
+    cycle_payloads = build_cycle_payloads()
+    return [
+        measure(name="cycle page build", size=nb_cycles, repeat=repeat, func=build_cycle_payloads),
+        measure(name="cycle payload serialization", size=nb_cycles, repeat=repeat,
+                func=lambda: [json.dumps(payload) for payload in cycle_payloads])
+    ]
+
+
+def print_results(results: list[BenchmarkResult]) -> None:
+    print(f"{'benchmark':<30} {'size':>8} {'best (ms)':>11} {'items/s':>13} {'peak (KiB)':>11} {'retained blocks':>16}")
+    for result in results:
+        print(f"{result.name:<30} {result.size:>8} {result.best_seconds * 1000:>11.2f} {result.throughput:>13,.0f} "
+              f"{result.peak_bytes / 1024:>11.1f} {result.retained_blocks:>16}")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the analysis hot paths on synthetic data")
+    parser.add_argument('--ticket-sizes', dest='ticket_sizes', type=int, nargs='*', default=DEFAULT_TICKET_SIZES,
+                        help='numbers of tickets of the ticket and bug benchmarks')
+    parser.add_argument('--cycle-sizes', dest='cycle_sizes', type=int, nargs='*', default=DEFAULT_CYCLE_SIZES,
+                        help='numbers of cycles of the cycle benchmarks')
+    parser.add_argument('--repeat', dest='repeat', type=int, default=DEFAULT_REPEAT,
+                        help='number of timed runs of each benchmark, the best one is reported')
+    parser.add_argument('--seed', dest='seed', type=int, default=0)
+    parser.add_argument('--output', dest='output', type=str, help='JSON file receiving the results')
+    args = parser.parse_args(argv)
+
+    results = []
+    for nb_tickets in args.ticket_sizes:
+        results += ticket_benchmarks(dataset=SyntheticDataset(seed=args.seed), nb_tickets=nb_tickets,
+                                     repeat=args.repeat)
+    for nb_cycles in args.cycle_sizes:
+        results += cycle_benchmarks(dataset=SyntheticDataset(seed=args.seed), nb_cycles=nb_cycles,
+                                    repeat=args.repeat)
+
+    print_results(results=results)
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump([result.to_json() for result in results], file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
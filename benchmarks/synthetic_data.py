@@ -0,0 +1,118 @@
+import random
+from datetime import datetime, timedelta, UTC
+from typing import Dict, Optional
+
+from src.analysis_service.ticket_aggregator import TECH_PROJECT_NAMES
+
+STATE_WEIGHTS = {
+    "Completed": 45,
+    "Canceled": 8,
+    "Backlog": 15,
+    "Ready to Dev": 10,
+    "Dev": 8,
+    "Dev Review": 5,
+    "Product Review": 3,
+    "Ready to Go-Live": 2,
+    "Triage": 2,
+    "Feedback": 2
+}
+PRODUCT_PROJECT_NAMES = ["Checkout", "Onboarding", "Search", "Notifications", "Reporting"]
+OTHER_LABELS = ["Frontend", "Backend", "Mobile", "Security", "Performance"]
+BUG_RATIO = 0.2
+DESCRIPTION_RATIO = 0.7
+CYCLE_DURATION_DAYS = 14
+START_DATE = datetime(2020, 1, 6, tzinfo=UTC)
+
+WORDS = ("the user cannot open page when order payment fails after refresh on mobile list export filter button "
+         "should display error message correctly in report dashboard settings").split()
+
+
+class SyntheticDataset:
+    """Realistic Linear issue and cycle nodes, generated deterministically from a seed."""
+
+    def __init__(self, seed: int = 0, team_key: str = "ABC"):
+        self._random = random.Random(seed)
+        self._team_key = team_key
+        self._states = list(STATE_WEIGHTS.keys())
+        self._state_weights = list(STATE_WEIGHTS.values())
+        self._projects = PRODUCT_PROJECT_NAMES + sorted(TECH_PROJECT_NAMES)
+
+    def issue_nodes(self, nb_tickets: int, first_number: int = 1) -> list[Dict]:
+        """Most recent issue first, as returned by Linear when ordering by creation date."""
+        return [self.issue_node(number=first_number + nb_tickets - 1 - index) for index in range(nb_tickets)]
+
+    def issue_node(self, number: int, cycle_name: Optional[str] = None) -> Dict:
+        rng = self._random
+        state = rng.choices(self._states, weights=self._state_weights)[0]
+        created_at = START_DATE + timedelta(hours=number * 3 + rng.random())
+        started_at = None if state in ("Backlog", "Triage", "Ready to Dev") else \
+            created_at + timedelta(hours=rng.expovariate(1 / 72))
+        completed_at = started_at + timedelta(hours=rng.expovariate(1 / 48)) \
+            if started_at is not None and state in ("Completed", "Canceled") else None
+        labels = [{"name": "Bug"}] if rng.random() < BUG_RATIO else []
+        labels += [{"name": label} for label in rng.sample(OTHER_LABELS, k=rng.randint(0, 2))]
+        project = rng.choice(self._projects) if rng.random() < 0.6 else None
+
+        return {
+            "id": f"{self._team_key.lower()}-issue-{number}",
+            "identifier": f"{self._team_key}-{number}",
+            "title": self._sentence(min_words=3, max_words=12),
+            "cycle": None if cycle_name is None else {"name": cycle_name},
+            "project": None if project is None else {"name": project},
+            "state": {"name": state},
+            "priorityLabel": rng.choice(["No priority", "Urgent", "High", "Medium", "Low"]),
+            "parent": {"identifier": f"{self._team_key}-{rng.randint(1, number)}"} if rng.random() < 0.1 else None,
+            "labels": {"nodes": labels},
+            "description": self._sentence(min_words=20, max_words=400) if rng.random() < DESCRIPTION_RATIO else None,
+            "url": f"https://linear.app/acme/issue/{self._team_key}-{number}",
+            "completedAt": _format_date(completed_at),
+            "startedAt": _format_date(started_at),
+            "createdAt": _format_date(created_at),
+            "updatedAt": _format_date(completed_at or started_at or created_at),
+            "archivedAt": None
+        }
+
+    def cycle_nodes(self, nb_cycles: int, nb_uncompleted_issues: int = 10) -> list[Dict]:
+        return [self.cycle_node(number=number, nb_uncompleted_issues=nb_uncompleted_issues)
+                for number in range(1, nb_cycles + 1)]
+
+    def cycle_node(self, number: int, nb_uncompleted_issues: int = 10) -> Dict:
+        rng = self._random
+        name = f"Cycle {number}"
+        starts_at = START_DATE + timedelta(days=(number - 1) * CYCLE_DURATION_DAYS)
+
+        scope = rng.randint(20, 60)
+        scope_history, in_progress_scope_history, completed_scope_history = [], [], []
+        completed = in_progress = 0
+        for _ in range(CYCLE_DURATION_DAYS + 1):
+            scope += rng.choice([0, 0, 0, 1, 2, -1])
+            completed = min(scope, completed + rng.randint(0, 5))
+            in_progress = min(scope - completed, max(0, in_progress + rng.randint(-2, 3)))
+            scope_history.append(scope)
+            completed_scope_history.append(completed)
+            in_progress_scope_history.append(in_progress)
+
+        return {
+            "id": f"{self._team_key.lower()}-cycle-{number}",
+            "number": number,
+            "name": name,
+            "team": {"key": self._team_key},
+            "startsAt": _format_date(starts_at),
+            "endsAt": _format_date(starts_at + timedelta(days=CYCLE_DURATION_DAYS)),
+            "scopeHistory": scope_history,
+            "completedScopeHistory": completed_scope_history,
+            "inProgressScopeHistory": in_progress_scope_history,
+            "progress": completed / scope if scope > 0 else 0.0,
+            "uncompletedIssuesUponClose": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [self.issue_node(number=number * 1000 + index, cycle_name=name)
+                          for index in range(nb_uncompleted_issues)]
+            }
+        }
+
+    def _sentence(self, min_words: int, max_words: int) -> str:
+        return " ".join(self._random.choices(WORDS, k=self._random.randint(min_words, max_words)))
+
+
+def _format_date(value: Optional[datetime]) -> Optional[str]:
+    return None if value is None else value.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
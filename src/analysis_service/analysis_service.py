@@ -2,34 +2,70 @@ from abc import ABC, abstractmethod
 from datetime import datetime, UTC
 from typing import Dict, Optional
 
+from src.analysis_service.snapshot_store import Snapshot, SnapshotStore
+from src.async_http_client import AsyncHttpClient
+from src.linear.async_linear_service import AsyncLinearService
 from src.linear.linear_service import LinearService
+from src.metrics import NOTION_WRITE_PHASE, PAGE_BUILD_PHASE, RunMetrics
+from src.notion.async_notion_service import AsyncNotionService
 from src.notion.notion_service import NotionService
 
+TREND_NB_WEEKS = 8
+
 
 class AnalysisService(ABC):
-    def __init__(self, linear_api_key: str, notion_api_key: str, team_key: str,
-                 linear_ticket_request_template: Optional[str], linear_bug_request_template: Optional[str],
-                 linear_cycle_request_template: Optional[str]):
-        self._linear_service = LinearService(api_key=linear_api_key, team_key=team_key,
-                                             linear_ticket_request_template=linear_ticket_request_template,
-                                             linear_bug_request_template=linear_bug_request_template,
-                                             linear_cycle_request_template=linear_cycle_request_template)
-        self._notion_service = NotionService(api_key=notion_api_key)
-        self._team_key = team_key
+    MODE: str
+
+    def __init__(self, linear_service: LinearService, notion_service: NotionService,
+                 metrics: Optional[RunMetrics] = None, snapshot_store: Optional[SnapshotStore] = None):
+        self._linear_service = linear_service
+        self._notion_service = notion_service
+        self._metrics = RunMetrics() if metrics is None else metrics
+        self._snapshot_store = snapshot_store
+        self._team_key = linear_service.team_key
         self._inspection_date = datetime.now(tz=UTC)
 
-    @abstractmethod
     def run(self) -> None:
+        with self._metrics.run(team_key=self._team_key, mode=self.MODE):
+            self._run()
+
+    async def run_async(self, async_http_client: AsyncHttpClient) -> None:
+        with self._metrics.run(team_key=self._team_key, mode=self.MODE):
+            await self._run_async(async_http_client=async_http_client)
+
+    @abstractmethod
+    def _run(self) -> None:
         pass
 
-    @staticmethod
-    def _bucket_tickets_per_status(tickets: list[Dict]) -> Dict:
-        results = {}
-        for ticket in tickets:
-            status = ticket['state']['name']
-            if status in results:
-                results[status].append(ticket)
-            else:
-                results[status] = [ticket]
-
-        return results
+    @abstractmethod
+    async def _run_async(self, async_http_client: AsyncHttpClient) -> None:
+        pass
+
+    def _async_services(self, async_http_client: AsyncHttpClient) -> tuple[AsyncLinearService, AsyncNotionService]:
+        return (AsyncLinearService(linear_service=self._linear_service, async_http_client=async_http_client,
+                                   metrics=self._metrics),
+                AsyncNotionService(notion_service=self._notion_service, async_http_client=async_http_client,
+                                   metrics=self._metrics))
+
+    def _weekly_snapshots(self, window: int, aggregates: Dict) -> list[Snapshot]:
+        """Weekly snapshots of the last weeks for the same analysis window, ending with the aggregates of this analysis,
+        which are only recorded by `_record_snapshot` once its page is inserted."""
+        if self._snapshot_store is None:
+            return []
+        snapshot = Snapshot(inspection_date=self._inspection_date, aggregates=aggregates)
+        previous_snapshots = self._snapshot_store.get_weekly(team_key=self._team_key, mode=self.MODE, window=window,
+                                                             until=self._inspection_date, nb_weeks=TREND_NB_WEEKS)
+        return ([previous_snapshot for previous_snapshot in previous_snapshots
+                 if previous_snapshot.week_label != snapshot.week_label] + [snapshot])[-TREND_NB_WEEKS:]
+
+    def _record_snapshot(self, window: int, aggregates: Dict) -> None:
+        if self._snapshot_store is not None:
+            self._snapshot_store.put(team_key=self._team_key, mode=self.MODE, window=window,
+                                     inspection_date=self._inspection_date, aggregates=aggregates)
+
+    def _insert_notion_page(self, payload: Dict) -> Dict:
+        with self._metrics.phase(NOTION_WRITE_PHASE):
+            return self._notion_service.insert_notion_page(payload=self._timed_payload(payload=payload))
+
+    def _timed_payload(self, payload: Dict) -> Dict:
+        return payload | {'children': self._metrics.timed_iter(PAGE_BUILD_PHASE, payload['children'])}
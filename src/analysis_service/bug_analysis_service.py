@@ -1,74 +1,102 @@
 from datetime import datetime
 from typing import Dict, Optional
 
+import numpy as np
+
 from src.analysis_service.analysis_service import AnalysisService
+from src.analysis_service.ticket_aggregator import STATUS_DIMENSION, TicketAggregator
+from src.analysis_service.snapshot_store import SnapshotStore
+from src.async_http_client import AsyncHttpClient
+from src.linear.linear_service import LinearService
+from src.linear.records import Ticket
+from src.metrics import AGGREGATION_PHASE, LINEAR_FETCH_PHASE, PAGE_BUILD_PHASE, RunMetrics
 from src.notion.last_bug_analysis_page_builder import LastBugAnalysisPageBuilder
+from src.notion.notion_service import NotionService
 from src.properties import Properties
 
+TIMEDELTA_PERCENTILES = [50, 75, 90, 99]
+NAT_EPOCH_MS = np.iinfo(np.int64).min
+
 
 class BugAnalysisService(AnalysisService):
-    def __init__(self, properties: Properties):
-        super().__init__(
-            linear_api_key=properties.linear_api_key,
-            notion_api_key=properties.notion_api_key,
-            team_key=properties.team_key,
-            linear_ticket_request_template=properties.linear_ticket_request_template,
-            linear_bug_request_template=properties.linear_bug_request_template,
-            linear_cycle_request_template=properties.linear_cycle_request_template
-        )
+    MODE = "BUG"
+
+    def __init__(self, properties: Properties, linear_service: LinearService, notion_service: NotionService,
+                 metrics: Optional[RunMetrics] = None, snapshot_store: Optional[SnapshotStore] = None):
+        super().__init__(linear_service=linear_service, notion_service=notion_service, metrics=metrics,
+                         snapshot_store=snapshot_store)
 
         self._database_id = properties.bug_analysis_db_id
         self._max_nb_tickets = properties.max_nb_tickets_to_analyze
 
-    def run(self) -> None:
-        tickets = self._linear_service.get_last_bugs(max_nb_tickets=self._max_nb_tickets)
+    def _run(self) -> None:
+        with self._metrics.phase(LINEAR_FETCH_PHASE):
+            tickets = self._linear_service.get_last_bugs(max_nb_tickets=self._max_nb_tickets)
+        payload, aggregates = self._build_notion_payload(tickets=tickets)
+        self._insert_notion_page(payload=payload)
+        self._record_snapshot(window=self._max_nb_tickets, aggregates=aggregates)
 
-        nb_tickets = len(tickets)
-        tickets_per_status = self._bucket_tickets_per_status(tickets=tickets)
-        timedelta = self._compute_timedelta(tickets=tickets)
+    async def _run_async(self, async_http_client: AsyncHttpClient) -> None:
+        linear_service, notion_service = self._async_services(async_http_client=async_http_client)
+        tickets = await linear_service.get_last_bugs(max_nb_tickets=self._max_nb_tickets)
+        payload, aggregates = self._build_notion_payload(tickets=tickets)
+        await notion_service.insert_notion_page(payload=self._timed_payload(payload=payload))
+        self._record_snapshot(window=self._max_nb_tickets, aggregates=aggregates)
 
-        notion_payload = LastBugAnalysisPageBuilder(
-            database_id=self._database_id,
-            team_key=self._team_key,
-            inspection_date=self._inspection_date,
-            nb_tickets=nb_tickets,
-            tickets_per_status=tickets_per_status,
-            timedelta=timedelta,
-            last_10_tickets=tickets[:10]
-        ).build()
+    def _build_notion_payload(self, tickets: list[Ticket]) -> tuple[Dict, Dict]:
+        """Notion page of the analysis, and the aggregates to record once it is inserted."""
+        with self._metrics.phase(AGGREGATION_PHASE):
+            aggregator = TicketAggregator(dimensions=[STATUS_DIMENSION]).add(tickets=tickets)
+            timedelta = self._compute_timedelta(tickets=tickets)
+            aggregates = {
+                'nb_tickets': aggregator.nb_tickets,
+                'tickets_per_status': aggregator.counts(STATUS_DIMENSION),
+                'timedelta': timedelta
+            }
+            weekly_snapshots = self._weekly_snapshots(window=self._max_nb_tickets, aggregates=aggregates)
 
-        self._notion_service.insert_notion_page(payload=notion_payload)
+        with self._metrics.phase(PAGE_BUILD_PHASE):
+            return LastBugAnalysisPageBuilder(
+                database_id=self._database_id,
+                team_key=self._team_key,
+                inspection_date=self._inspection_date,
+                nb_tickets=aggregator.nb_tickets,
+                tickets_per_status=aggregator.buckets(STATUS_DIMENSION),
+                timedelta=timedelta,
+                last_10_tickets=tickets[:10],
+                weekly_snapshots=weekly_snapshots
+            ).build(lazy=True), aggregates
 
     @staticmethod
-    def _compute_timedelta(tickets: list[Dict]) -> Dict:
+    def _compute_timedelta(tickets: list[Ticket]) -> Dict:
+        created_at = BugAnalysisService._to_datetime64(values=[ticket.created_at for ticket in tickets])
+        started_at = BugAnalysisService._to_datetime64(values=[ticket.started_at for ticket in tickets])
+        completed_at = BugAnalysisService._to_datetime64(values=[ticket.completed_at for ticket in tickets])
+
         return {
-            'delta_created_started': BugAnalysisService._compute_sub_timedelta(
-                tickets=tickets, date_keys=['createdAt', 'startedAt']),
-            'delta_started_completed': BugAnalysisService._compute_sub_timedelta(
-                tickets=tickets, date_keys=['startedAt', 'completedAt']),
-            'delta_created_completed': BugAnalysisService._compute_sub_timedelta(
-                tickets=tickets, date_keys=['createdAt', 'completedAt'])
+            'delta_created_started': BugAnalysisService._compute_sub_timedelta(start=created_at, end=started_at),
+            'delta_started_completed': BugAnalysisService._compute_sub_timedelta(start=started_at, end=completed_at),
+            'delta_created_completed': BugAnalysisService._compute_sub_timedelta(start=created_at, end=completed_at)
         }
 
     @staticmethod
-    def _compute_sub_timedelta(tickets: list[Dict], date_keys: list[str]) -> Optional[Dict]:
-        sublist_tickets = BugAnalysisService._sublist_contains_keys(lst=tickets, keys=[date_keys[0], date_keys[1]])
-        if len(sublist_tickets) > 0:
-            value_hours = 0
-            for ticket in sublist_tickets:
-                value_hours += (datetime.fromisoformat(ticket[date_keys[1]]) - datetime.fromisoformat(
-                    ticket[date_keys[0]])).total_seconds() / 3600.0
+    def _compute_sub_timedelta(start: np.ndarray, end: np.ndarray) -> Optional[Dict]:
+        mask = ~(np.isnat(start) | np.isnat(end))
+        sample_size = int(np.count_nonzero(mask))
+        if sample_size > 0:
+            value_hours = (end[mask] - start[mask]) / np.timedelta64(1, 'h')
+            median, p75, p90, p99 = np.percentile(value_hours, TIMEDELTA_PERCENTILES)
 
             return {
-                "value_hours": value_hours / len(sublist_tickets),
-                "sample_size": len(sublist_tickets)
+                "value_hours": float(value_hours.mean()),
+                "median_hours": float(median),
+                "p75_hours": float(p75),
+                "p90_hours": float(p90),
+                "p99_hours": float(p99),
+                "sample_size": sample_size
             }
 
     @staticmethod
-    def _sublist_contains_keys(lst: list[Dict], keys: list[str]) -> list[Dict]:
-        sublist = []
-        for item in lst:
-            if False not in [key in item.keys() and item[key] is not None for key in keys]:
-                sublist.append(item)
-
-        return sublist
+    def _to_datetime64(values: list[Optional[datetime]]) -> np.ndarray:
+        return np.array([NAT_EPOCH_MS if value is None else int(value.timestamp() * 1000) for value in values],
+                        dtype=np.int64).view('datetime64[ms]')
@@ -1,41 +1,80 @@
-from typing import Dict
+from typing import Dict, Optional
 
 from src.analysis_service.analysis_service import AnalysisService
+from src.analysis_service.snapshot_store import SnapshotStore
+from src.async_http_client import AsyncHttpClient
+from src.lazy_import import lazy_import
+from src.linear.linear_service import LinearService
+from src.linear.records import Cycle
+from src.metrics import LINEAR_FETCH_PHASE, NOTION_QUERY_PHASE, PAGE_BUILD_PHASE, RunMetrics
+from src.notion.async_notion_service import AsyncNotionService
 from src.notion.cycle_analysis_page_builder import CycleAnalysisPageBuilder
+from src.notion.notion_service import NotionService
 from src.properties import Properties
 
+asyncio = lazy_import('asyncio')
+
 
 class CycleAnalysisService(AnalysisService):
-    def __init__(self, properties: Properties):
-        super().__init__(
-            linear_api_key=properties.linear_api_key,
-            notion_api_key=properties.notion_api_key,
-            team_key=properties.team_key,
-            linear_ticket_request_template=properties.linear_ticket_request_template,
-            linear_bug_request_template=properties.linear_bug_request_template,
-            linear_cycle_request_template=properties.linear_cycle_request_template
-        )
+    MODE = "CYCLE"
+
+    def __init__(self, properties: Properties, linear_service: LinearService, notion_service: NotionService,
+                 metrics: Optional[RunMetrics] = None, snapshot_store: Optional[SnapshotStore] = None):
+        super().__init__(linear_service=linear_service, notion_service=notion_service, metrics=metrics,
+                         snapshot_store=snapshot_store)
 
         self._database_id = properties.cycle_analysis_db_id
 
-    def run(self) -> None:
-        cycle_data = self._linear_service.get_cycle_data()
+    def _run(self) -> None:
+        with self._metrics.phase(NOTION_QUERY_PHASE):
+            documented_cycles = self._notion_service.get_documented_cycles(database_id=self._database_id,
+                                                                           team_key=self._team_key)
+        with self._metrics.phase(LINEAR_FETCH_PHASE):
+            cycle_data = self._linear_service.get_cycle_data(documented_cycle_names=documented_cycles.keys())
         cycle_data_by_name = self._bucket_cycle_data_by_name(cycle_data=cycle_data)
 
         for cycle_name in cycle_data_by_name.keys():
-            if not self._notion_service.is_cycle_doc_exists(database_id=self._database_id, cycle_name=cycle_name):
-                notion_payload = CycleAnalysisPageBuilder(
-                    database_id=self._database_id,
-                    team_key=self._team_key,
-                    cycle_name=cycle_name,
-                    inspection_date=self._inspection_date,
-                    cycle_data=cycle_data_by_name[cycle_name]
-                ).build()
-                self._notion_service.insert_notion_page(payload=notion_payload)
+            if cycle_name not in documented_cycles:
+                notion_payload = self._build_notion_payload(cycle_name=cycle_name,
+                                                            cycle_data=cycle_data_by_name[cycle_name])
+                page = self._insert_notion_page(payload=notion_payload)
+                self._notion_service.register_cycle_doc(database_id=self._database_id, team_key=self._team_key,
+                                                        cycle_name=cycle_name, page_id=page['id'])
+
+    async def _run_async(self, async_http_client: AsyncHttpClient) -> None:
+        linear_service, notion_service = self._async_services(async_http_client=async_http_client)
+        documented_cycles = await notion_service.get_documented_cycles(database_id=self._database_id,
+                                                                       team_key=self._team_key)
+        cycle_data = await linear_service.get_cycle_data(documented_cycle_names=documented_cycles.keys())
+        cycle_data_by_name = self._bucket_cycle_data_by_name(cycle_data=cycle_data)
+
+        await asyncio.gather(*[
+            self._insert_cycle_doc_async(notion_service=notion_service, cycle_name=cycle_name,
+                                         cycle_data=cycle_data_by_name[cycle_name])
+            for cycle_name in cycle_data_by_name.keys() if cycle_name not in documented_cycles
+        ])
+
+    async def _insert_cycle_doc_async(self, notion_service: AsyncNotionService, cycle_name: str,
+                                      cycle_data: Cycle) -> None:
+        page = await notion_service.insert_notion_page(
+            payload=self._timed_payload(payload=self._build_notion_payload(cycle_name=cycle_name,
+                                                                           cycle_data=cycle_data)))
+        notion_service.register_cycle_doc(database_id=self._database_id, team_key=self._team_key,
+                                          cycle_name=cycle_name, page_id=page['id'])
+
+    def _build_notion_payload(self, cycle_name: str, cycle_data: Cycle) -> Dict:
+        with self._metrics.phase(PAGE_BUILD_PHASE):
+            return CycleAnalysisPageBuilder(
+                database_id=self._database_id,
+                team_key=self._team_key,
+                cycle_name=cycle_name,
+                inspection_date=self._inspection_date,
+                cycle_data=cycle_data
+            ).build(lazy=True)
 
     @staticmethod
-    def _bucket_cycle_data_by_name(cycle_data: Dict) -> Dict:
+    def _bucket_cycle_data_by_name(cycle_data: list[Cycle]) -> Dict[str, Cycle]:
         results = {}
         for item in cycle_data:
-            results[item['name']] = item
+            results[item.name] = item
         return results
@@ -0,0 +1,17 @@
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.analysis_service.analysis_service import AnalysisService
+
+# The service of a mode, with its page builder and dependencies, is only imported when the mode is selected
+ANALYSIS_SERVICES = {
+    "BUG": ("src.analysis_service.bug_analysis_service", "BugAnalysisService"),
+    "CYCLE": ("src.analysis_service.cycle_analysis_service", "CycleAnalysisService"),
+    "TICKET": ("src.analysis_service.ticket_analysis_service", "TicketAnalysisService")
+}
+
+
+def load_analysis_service(mode: str) -> type['AnalysisService']:
+    module_name, class_name = ANALYSIS_SERVICES[mode]
+    return getattr(importlib.import_module(module_name), class_name)
@@ -0,0 +1,72 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict
+
+from src.defaults import DEFAULT_SNAPSHOT_STORE_PATH
+
+
+class Snapshot:
+    __slots__ = ('inspection_date', 'aggregates')
+
+    def __init__(self, inspection_date: datetime, aggregates: Dict):
+        self.inspection_date = inspection_date
+        self.aggregates = aggregates
+
+    @property
+    def week_label(self) -> str:
+        year, week, _ = self.inspection_date.isocalendar()
+        return f"{year}-W{week:02d}"
+
+
+class SnapshotStore:
+    """Aggregates computed by the analyses, per team, mode, analysis window (the number of analyzed tickets) and
+    inspection date, to follow their trend over time."""
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_STORE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "team_key TEXT NOT NULL, mode TEXT NOT NULL, inspection_date TEXT NOT NULL, data TEXT NOT NULL, "
+                "analysis_window INTEGER, PRIMARY KEY (team_key, mode, inspection_date))")
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(snapshots)")]
+            if 'analysis_window' not in columns:
+                # the snapshots recorded without their window are left out of the trends
+                self._connection.execute("ALTER TABLE snapshots ADD COLUMN analysis_window INTEGER")
+
+    def __enter__(self) -> 'SnapshotStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def put(self, team_key: str, mode: str, window: int, inspection_date: datetime, aggregates: Dict) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO snapshots (team_key, mode, analysis_window, inspection_date, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (team_key, mode, window, inspection_date.isoformat(), json.dumps(aggregates, separators=(',', ':'))))
+
+    def get_weekly(self, team_key: str, mode: str, window: int, until: datetime, nb_weeks: int) -> list[Snapshot]:
+        """Latest snapshot of each of the last `nb_weeks` ISO weeks up to `until` having one, the oldest first."""
+        since = until - timedelta(weeks=nb_weeks)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT inspection_date, data FROM snapshots WHERE team_key = ? AND mode = ? AND analysis_window = ? "
+                "AND inspection_date > ? AND inspection_date <= ? ORDER BY inspection_date",
+                (team_key, mode, window, since.isoformat(), until.isoformat())).fetchall()
+
+        snapshots_per_week: Dict[str, Snapshot] = {}
+        for inspection_date, data in rows:
+            snapshot = Snapshot(inspection_date=datetime.fromisoformat(inspection_date), aggregates=json.loads(data))
+            snapshots_per_week[snapshot.week_label] = snapshot
+        return list(snapshots_per_week.values())[-nb_weeks:]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,95 @@
+from itertools import chain
+from typing import Callable, Dict, Iterable
+
+from src.linear.records import Ticket
+
+TECH_PROJECT_NAMES = frozenset(['Payment Optimizations', 'Tech Improvements'])
+
+
+class Bucket:
+    __slots__ = ('count', 'references')
+
+    def __init__(self):
+        self.count = 0
+        self.references = []
+
+
+class Dimension:
+    def __init__(self, name: str, classify: Callable[[Ticket], str], referenced_keys: Iterable[str] = ()):
+        self._name = name
+        self._classify = classify
+        self._referenced_keys = frozenset(referenced_keys)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def classify(self) -> Callable[[Ticket], str]:
+        return self._classify
+
+    @property
+    def referenced_keys(self) -> frozenset[str]:
+        return self._referenced_keys
+
+
+class TicketAggregator:
+    def __init__(self, dimensions: list[Dimension]):
+        self._dimensions = dimensions
+        self._buckets_per_dimension = {dimension.name: {} for dimension in dimensions}
+        self._nb_tickets = 0
+
+    @property
+    def nb_tickets(self) -> int:
+        return self._nb_tickets
+
+    def buckets(self, dimension: Dimension) -> Dict[str, Bucket]:
+        return self._buckets_per_dimension[dimension.name]
+
+    def counts(self, dimension: Dimension) -> Dict[str, int]:
+        return {key: bucket.count for key, bucket in self._buckets_per_dimension[dimension.name].items()}
+
+    def add(self, tickets: Iterable[Ticket]) -> 'TicketAggregator':
+        classifiers = [(dimension.classify, dimension.referenced_keys, self._buckets_per_dimension[dimension.name])
+                       for dimension in self._dimensions]
+        nb_tickets = 0
+        for ticket in tickets:
+            nb_tickets += 1
+            for classify, referenced_keys, buckets in classifiers:
+                key = classify(ticket)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = Bucket()
+                bucket.count += 1
+                if key in referenced_keys:
+                    bucket.references.append((ticket.identifier, ticket.url))
+
+        self._nb_tickets += nb_tickets
+        return self
+
+    def add_pages(self, pages: Iterable[list[Ticket]]) -> 'TicketAggregator':
+        return self.add(chain.from_iterable(pages))
+
+
+def _classify_status(ticket: Ticket) -> str:
+    return ticket.state
+
+
+def _classify_description(ticket: Ticket) -> str:
+    return 'Description' if ticket.has_description else 'No Description'
+
+
+def _classify_type(ticket: Ticket) -> str:
+    if ticket.is_bug:
+        return 'Bug'
+    if ticket.project is None:
+        return 'Product Task without a project'
+    if ticket.project in TECH_PROJECT_NAMES:
+        return 'Tech Task'
+    return 'Product Task with a project'
+
+
+STATUS_DIMENSION = Dimension(name='status', classify=_classify_status)
+DESCRIPTION_DIMENSION = Dimension(name='description', classify=_classify_description,
+                                  referenced_keys=['No Description'])
+TYPE_DIMENSION = Dimension(name='type', classify=_classify_type)
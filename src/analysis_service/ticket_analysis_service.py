@@ -1,77 +1,65 @@
-from typing import Dict
+from typing import Dict, Iterable, Optional
 
 from src.analysis_service.analysis_service import AnalysisService
+from src.analysis_service.ticket_aggregator import (DESCRIPTION_DIMENSION, STATUS_DIMENSION, TYPE_DIMENSION,
+                                                     TicketAggregator)
+from src.analysis_service.snapshot_store import SnapshotStore
+from src.async_http_client import AsyncHttpClient
+from src.linear.linear_service import LinearService
+from src.linear.records import Ticket
+from src.metrics import AGGREGATION_PHASE, LINEAR_FETCH_PHASE, PAGE_BUILD_PHASE, RunMetrics
 from src.notion.last_ticket_analysis_page_builder import LastTicketAnalysisPageBuilder
+from src.notion.notion_service import NotionService
 from src.properties import Properties
 
 
 class TicketAnalysisService(AnalysisService):
-    def __init__(self, properties: Properties):
-        super().__init__(
-            linear_api_key=properties.linear_api_key,
-            notion_api_key=properties.notion_api_key,
-            team_key=properties.team_key,
-            linear_ticket_request_template=properties.linear_ticket_request_template,
-            linear_bug_request_template=properties.linear_bug_request_template,
-            linear_cycle_request_template=properties.linear_cycle_request_template
-        )
+    MODE = "TICKET"
+
+    def __init__(self, properties: Properties, linear_service: LinearService, notion_service: NotionService,
+                 metrics: Optional[RunMetrics] = None, snapshot_store: Optional[SnapshotStore] = None):
+        super().__init__(linear_service=linear_service, notion_service=notion_service, metrics=metrics,
+                         snapshot_store=snapshot_store)
 
         self._database_id = properties.ticket_analysis_db_id
         self._max_nb_tickets = properties.max_nb_tickets_to_analyze
 
-    def run(self) -> None:
-        tickets = self._linear_service.get_last_tickets(max_nb_tickets=self._max_nb_tickets)
-
-        nb_tickets = len(tickets)
-        tickets_per_status = self._bucket_tickets_per_status(tickets=tickets)
-        tickets_per_description_status = self._bucket_tickets_per_description_status(tickets=tickets)
-        tickets_per_type = self._bucket_tickets_per_type(tickets=tickets)
-
-        notion_payload = LastTicketAnalysisPageBuilder(
-            database_id=self._database_id,
-            team_key=self._team_key,
-            inspection_date=self._inspection_date,
-            nb_tickets=nb_tickets,
-            tickets_per_description=tickets_per_description_status,
-            tickets_per_status=tickets_per_status,
-            tickets_per_type=tickets_per_type
-        ).build()
-
-        self._notion_service.insert_notion_page(payload=notion_payload)
-
-    @staticmethod
-    def _bucket_tickets_per_description_status(tickets: list[Dict]) -> Dict:
-        results = {}
-        for ticket in tickets:
-            if ticket['description'] is not None and len(ticket['description']) > 0:
-                key = 'Description'
-            else:
-                key = 'No Description'
-
-            if key in results.keys():
-                results[key].append(ticket)
-            else:
-                results[key] = [ticket]
-
-        return results
+    def _run(self) -> None:
+        with self._metrics.phase(LINEAR_FETCH_PHASE):
+            pages = self._linear_service.iter_last_tickets(max_nb_tickets=self._max_nb_tickets)
+        pages = self._metrics.timed_iter(LINEAR_FETCH_PHASE, pages)
+        payload, aggregates = self._build_notion_payload(pages=pages)
+        self._insert_notion_page(payload=payload)
+        self._record_snapshot(window=self._max_nb_tickets, aggregates=aggregates)
 
-    @staticmethod
-    def _bucket_tickets_per_type(tickets: list[Dict]) -> Dict:
-        results = {}
-        for ticket in tickets:
-            if 'Bug' in [label['name'] for label in ticket['labels']['nodes']]:
-                key = 'Bug'
-            elif (ticket['project'] is not None and ticket['project']['name'] is not None and
-                  ticket['project']['name'] in ['Payment Optimizations', 'Tech Improvements']):
-                key = 'Tech Task'
-            elif ticket['project'] is not None:
-                key = 'Product Task with a project'
-            else:
-                key = 'Product Task without a project'
+    async def _run_async(self, async_http_client: AsyncHttpClient) -> None:
+        linear_service, notion_service = self._async_services(async_http_client=async_http_client)
+        tickets = await linear_service.get_last_tickets(max_nb_tickets=self._max_nb_tickets)
+        payload, aggregates = self._build_notion_payload(pages=[tickets])
+        await notion_service.insert_notion_page(payload=self._timed_payload(payload=payload))
+        self._record_snapshot(window=self._max_nb_tickets, aggregates=aggregates)
 
-            if key in results.keys():
-                results[key].append(ticket)
-            else:
-                results[key] = [ticket]
+    def _build_notion_payload(self, pages: Iterable[list[Ticket]]) -> tuple[Dict, Dict]:
+        """Notion page of the analysis, and the aggregates to record once it is inserted."""
+        with self._metrics.phase(AGGREGATION_PHASE):
+            aggregator = TicketAggregator(dimensions=[STATUS_DIMENSION, DESCRIPTION_DIMENSION, TYPE_DIMENSION])
+            aggregator.add_pages(pages=pages)
+            aggregates = {
+                'nb_tickets': aggregator.nb_tickets,
+                'tickets_per_status': aggregator.counts(STATUS_DIMENSION),
+                'tickets_per_description': aggregator.counts(DESCRIPTION_DIMENSION),
+                'tickets_per_type': aggregator.counts(TYPE_DIMENSION)
+            }
+            weekly_snapshots = self._weekly_snapshots(window=self._max_nb_tickets, aggregates=aggregates)
 
-        return results
+        with self._metrics.phase(PAGE_BUILD_PHASE):
+            return LastTicketAnalysisPageBuilder(
+                database_id=self._database_id,
+                team_key=self._team_key,
+                inspection_date=self._inspection_date,
+                nb_tickets=aggregator.nb_tickets,
+                tickets_per_description=aggregator.buckets(DESCRIPTION_DIMENSION),
+                tickets_per_status=aggregator.buckets(STATUS_DIMENSION),
+                tickets_per_type=aggregator.buckets(TYPE_DIMENSION),
+                weekly_snapshots=weekly_snapshots
+            ).build(lazy=True), aggregates
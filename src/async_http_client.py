@@ -0,0 +1,22 @@
+from typing import Any, Callable, Dict, Optional
+
+from src.defaults import DEFAULT_MAX_CONCURRENCY
+from src.http_client import HttpClient
+from src.lazy_import import lazy_import
+
+asyncio = lazy_import('asyncio')
+
+
+class AsyncHttpClient:
+    def __init__(self, http_client: HttpClient, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self._http_client = http_client
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def post(self, url: str, payload: Dict, headers: Dict,
+                   response_json_path: Optional[list[str]] = None, idempotent: bool = True) -> Dict:
+        return await self.run(self._http_client.post, url=url, payload=payload, headers=headers,
+                              response_json_path=response_json_path, idempotent=idempotent)
+
+    async def run(self, func: Callable[..., Any], /, *args, **kwargs) -> Any:
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
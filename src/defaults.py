@@ -0,0 +1,16 @@
+# The defaults of the command line and of the configuration file, kept apart from the modules using them so that
+# parsing the arguments does not import the services
+LINEAR_URL = "https://api.linear.app/graphql"
+NOTION_URL = "https://api.notion.com/v1"
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_MAX_CONCURRENCY = 4
+
+DEFAULT_CACHE_PATH = ".cache/linear_responses.sqlite3"
+DEFAULT_CACHE_MAX_SIZE_MB = 64
+DEFAULT_ISSUE_STORE_PATH = ".cache/linear_issues.sqlite3"
+DEFAULT_SNAPSHOT_STORE_PATH = ".cache/analysis_snapshots.sqlite3"
+DEFAULT_PROFILE_DIR = "profiles"
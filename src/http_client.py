@@ -1,24 +1,180 @@
 import logging
-from typing import Dict, Optional
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, Optional
+from urllib.parse import urlsplit
 
-import requests
-from requests import HTTPError
+from src.defaults import DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT
+from src.lazy_import import lazy_import
+from src.metrics import RunMetrics
+from src.rate_limiter import RateLimiter
+
+if TYPE_CHECKING:
+    import requests
+else:
+    # requests is only loaded by the first session, i.e. under the lock of the client
+    requests = lazy_import('requests')
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# a server error may come after the request was applied, only a rate limited request is known not to be
+NON_IDEMPOTENT_RETRYABLE_STATUS_CODES = {429}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
 
 
 class HttpClient:
-    def __init__(self, headers: Dict):
-        self._headers = headers
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, max_retries: int = DEFAULT_MAX_RETRIES,
+                 rate_limiter: Optional[RateLimiter] = None, metrics: Optional[RunMetrics] = None):
+        self._pool_size = pool_size
+        self._timeout = (connect_timeout, read_timeout)
+        self._max_retries = max_retries
+        self._rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+        self._metrics = RunMetrics() if metrics is None else metrics
+        self._sessions: Dict[str, 'requests.Session'] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'HttpClient':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def post(self, url: str, payload: Dict, headers: Dict, response_json_path: Optional[list[str]] = None,
+             idempotent: bool = True) -> Dict:
+        """A request which is not `idempotent`, e.g. a page creation, is not retried on server errors."""
+        return self._request(method='post', url=url, payload=payload, headers=headers,
+                             response_json_path=response_json_path, idempotent=idempotent)
+
+    def patch(self, url: str, payload: Dict, headers: Dict, response_json_path: Optional[list[str]] = None,
+              idempotent: bool = True) -> Dict:
+        """A request which is not `idempotent`, e.g. a block append, is not retried on server errors."""
+        return self._request(method='patch', url=url, payload=payload, headers=headers,
+                             response_json_path=response_json_path, idempotent=idempotent)
+
+    @contextmanager
+    def post_stream(self, url: str, payload: Dict, headers: Dict) -> Iterator[BinaryIO]:
+        response = self._send(method='post', url=url, payload=payload, headers=headers, stream=True)
+        with response:
+            self._check_status(method='post', url=url, response=response)
+            response.raw.decode_content = True
+            try:
+                yield response.raw
+            finally:
+                self._metrics.record_bytes_received(method='post', url=url, nb_bytes=response.raw.tell())
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
 
-    def post(self, url: str, payload: Dict, response_json_path: Optional[list[str]] = None) -> Dict:
-        response = requests.post(url, headers=self._headers, json=payload)
+    def _request(self, method: str, url: str, payload: Dict, headers: Dict,
+                 response_json_path: Optional[list[str]], idempotent: bool = True) -> Dict:
+        response = self._send(method=method, url=url, payload=payload, headers=headers, idempotent=idempotent)
+        self._check_status(method=method, url=url, response=response)
+
+        json_response = response.json()
+        self._metrics.record_bytes_received(method=method, url=url, nb_bytes=response.raw.tell())
+        if response_json_path is not None:
+            for path in response_json_path:
+                json_response = json_response[path]
+        return json_response
+
+    @staticmethod
+    def _check_status(method: str, url: str, response: 'requests.Response') -> None:
         code = response.status_code
+        if not 200 <= code < 300:
+            logging.error(f"{method} {url}: code received: {code} (reason: {response.reason})")
+            raise requests.HTTPError(response.reason)
+
+    def _send(self, method: str, url: str, payload: Dict, headers: Dict, stream: bool = False,
+              idempotent: bool = True) -> 'requests.Response':
+        host = urlsplit(url).netloc
+        session = self._session(url)
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire(host)
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, headers=headers, json=payload, timeout=self._timeout,
+                                           stream=stream)
+            except requests.ConnectTimeout:
+                self._metrics.record_request(method=method, url=url, status='timeout',
+                                             seconds=time.perf_counter() - start, bytes_sent=0,
+                                             retried=attempt < self._max_retries)
+                if attempt >= self._max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logging.warning(f"{method} {url}: connection timed out, retrying in {delay:.1f}s")
+            else:
+                retried = attempt < self._max_retries and self._is_retryable(response=response, idempotent=idempotent)
+                self._metrics.record_request(method=method, url=url, status=str(response.status_code),
+                                             seconds=time.perf_counter() - start,
+                                             bytes_sent=len(response.request.body or b''), retried=retried)
+                if not retried:
+                    return response
+                retry_after = self._retry_after(response)
+                if retry_after is not None:
+                    delay = retry_after
+                    self._rate_limiter.pause(host=host, seconds=delay)
+                else:
+                    delay = self._backoff_delay(attempt)
+                logging.warning(f"{method} {url}: code received: {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _session(self, url: str) -> 'requests.Session':
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+
+    @staticmethod
+    def _is_retryable(response: 'requests.Response', idempotent: bool = True) -> bool:
+        if response.status_code in (RETRYABLE_STATUS_CODES if idempotent else NON_IDEMPOTENT_RETRYABLE_STATUS_CODES):
+            return True
+        return response.status_code == 400 and HttpClient._is_linear_rate_limited(response)
+
+    @staticmethod
+    def _is_linear_rate_limited(response: 'requests.Response') -> bool:
+        try:
+            errors = response.json().get('errors') or []
+        except ValueError:
+            return False
+        return any((error.get('extensions') or {}).get('code') == 'RATELIMITED' for error in errors)
+
+    @staticmethod
+    def _retry_after(response: 'requests.Response') -> Optional[float]:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(tz=UTC)).total_seconds())
+                except (TypeError, ValueError):
+                    return None
+
+        reset_epoch_ms = response.headers.get('X-RateLimit-Requests-Reset')
+        if reset_epoch_ms is not None and response.headers.get('X-RateLimit-Requests-Remaining') == '0':
+            try:
+                return max(0.0, int(reset_epoch_ms) / 1000 - time.time())
+            except ValueError:
+                return None
+        return None
 
-        if 200 <= code < 300:
-            json_response = response.json()
-            if response_json_path is not None:
-                for path in response_json_path:
-                    json_response = json_response[path]
-            return json_response
-        else:
-            logging.error(f"post {url}: code received: {code} (reason: {response.reason})")
-            raise HTTPError(response.reason)
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
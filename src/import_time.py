@@ -0,0 +1,84 @@
+import importlib
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+ROOT_PATH = Path(__file__).resolve().parents[1]
+NB_TOP_IMPORTS = 20
+DEFERRED_MODULES = ['requests', 'ijson']
+ASYNC_DEFERRED_MODULES = ['asyncio']
+
+_START_MARKER = "import time: measuring"
+
+
+class ImportTime:
+    __slots__ = ('module', 'depth', 'self_us', 'cumulative_us')
+
+    def __init__(self, module: str, depth: int, self_us: int, cumulative_us: int):
+        self.module = module
+        self.depth = depth
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+
+    @staticmethod
+    def parse(line: str) -> 'ImportTime':
+        """Parses a `import time:  <self> | <cumulative> | <indented module>` line of `python -X importtime`."""
+        prefix, cumulative_us, module = line.split('|')
+        indented_module = module.rstrip()[1:]
+        return ImportTime(module=indented_module.lstrip(),
+                          depth=(len(indented_module) - len(indented_module.lstrip())) // 2,
+                          self_us=int(prefix.split(':')[1]), cumulative_us=int(cumulative_us))
+
+
+def import_time_report(modes: list[str], use_async: bool = False, nb_top_imports: int = NB_TOP_IMPORTS) -> str:
+    """Measures, in a fresh interpreter, the imports of the tool, of the modes and of the modules they defer.
+
+    The modules deferred until their first use are loaded last, so that their cost shows apart from the startup.
+    """
+    deferred_modules = DEFERRED_MODULES + (ASYNC_DEFERRED_MODULES if use_async else [])
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'src.import_time', ','.join(modes), ','.join(deferred_modules)],
+        cwd=ROOT_PATH, capture_output=True, text=True, check=True)
+
+    lines = completed.stderr.splitlines()
+    import_times = [ImportTime.parse(line) for line in lines[lines.index(_START_MARKER) + 1:]
+                    if line.startswith('import time:') and not line.startswith('import time: self')]
+    steps = json.loads(completed.stdout)
+
+    report = [f"{'step':<40} {'time (ms)':>10}"]
+    report += [f"{label:<40} {seconds * 1000:>10.1f}" for label, seconds in steps]
+    report.append(f"{'total':<40} {sum(seconds for _, seconds in steps) * 1000:>10.1f}")
+    report.append("")
+    report.append(f"Top {nb_top_imports} modules, by self import time:")
+    report.append(f"{'self (ms)':>10} {'cumulative (ms)':>16}  module")
+    for import_time in sorted(import_times, key=lambda import_time: import_time.self_us, reverse=True)[:nb_top_imports]:
+        report.append(f"{import_time.self_us / 1000:>10.1f} {import_time.cumulative_us / 1000:>16.1f}  "
+                      f"{import_time.module}")
+    return "\n".join(report)
+
+
+def _measure(modes: list[str], deferred_modules: list[str]) -> list[tuple[str, float]]:
+    steps = []
+
+    def step(label: str, func: Callable[[], object]) -> None:
+        start = time.perf_counter()
+        func()
+        steps.append((label, time.perf_counter() - start))
+
+    step("src.main", lambda: importlib.import_module('src.main'))
+    from src.analysis_service.registry import load_analysis_service
+    for mode in modes:
+        step(f"mode {mode}", lambda: load_analysis_service(mode))
+    for module_name in deferred_modules:
+        # any attribute access runs a lazily imported module
+        step(f"first use of {module_name}", lambda: importlib.import_module(module_name).__dict__)
+    return steps
+
+
+if __name__ == "__main__":
+    print(_START_MARKER, file=sys.stderr, flush=True)
+    print(json.dumps(_measure(modes=[mode for mode in sys.argv[1].split(',') if mode],
+                              deferred_modules=[name for name in sys.argv[2].split(',') if name])))
@@ -0,0 +1,33 @@
+import io
+import json
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from src.lazy_import import lazy_import
+
+if TYPE_CHECKING:
+    import ijson
+else:
+    # ijson is only loaded by the first decoded page, under the lock since the pages are decoded by several threads
+    ijson = lazy_import('ijson')
+
+_ijson_lock = threading.Lock()
+
+
+def decode_items(body: bytes, items_path: list[str],
+                 item_factory: Optional[Callable[[Any], Any]] = None) -> tuple[list, Dict]:
+    """Decode the array at `items_path` one element at a time, and return its items with the page info of its
+    connection."""
+    page_info_prefix = '.'.join(items_path[:-1] + ['pageInfo'])
+    with _ijson_lock:
+        parse_items = ijson.items
+    # the query documents select the page info before the nodes, so this stops early
+    page_info = next(parse_items(io.BytesIO(body), page_info_prefix, use_float=True), None)
+    if page_info is None:
+        errors = json.loads(body).get('errors')
+        if errors:
+            raise ValueError(f"GraphQL errors in the response: {json.dumps(errors)}")
+        raise ValueError(f"no '{page_info_prefix}' object in the response")
+
+    items = parse_items(io.BytesIO(body), f"{'.'.join(items_path)}.item", use_float=True)
+    return list(items) if item_factory is None else [item_factory(item) for item in items], page_info
@@ -0,0 +1,32 @@
+from typing import Collection, Optional
+
+from src.async_http_client import AsyncHttpClient
+from src.linear.linear_service import LinearService
+from src.linear.records import Cycle, Ticket
+from src.metrics import LINEAR_FETCH_PHASE, RunMetrics
+
+
+class AsyncLinearService:
+    def __init__(self, linear_service: LinearService, async_http_client: AsyncHttpClient,
+                 metrics: Optional[RunMetrics] = None):
+        self._linear_service = linear_service
+        self._async_http_client = async_http_client
+        self._metrics = RunMetrics() if metrics is None else metrics
+
+    @property
+    def team_key(self) -> str:
+        return self._linear_service.team_key
+
+    async def get_last_tickets(self, max_nb_tickets: int) -> list[Ticket]:
+        return await self._async_http_client.run(
+            self._metrics.timed(LINEAR_FETCH_PHASE, self._linear_service.get_last_tickets),
+            max_nb_tickets=max_nb_tickets)
+
+    async def get_last_bugs(self, max_nb_tickets: int) -> list[Ticket]:
+        return await self._async_http_client.run(
+            self._metrics.timed(LINEAR_FETCH_PHASE, self._linear_service.get_last_bugs), max_nb_tickets=max_nb_tickets)
+
+    async def get_cycle_data(self, documented_cycle_names: Collection[str] = ()) -> list[Cycle]:
+        return await self._async_http_client.run(
+            self._metrics.timed(LINEAR_FETCH_PHASE, self._linear_service.get_cycle_data),
+            documented_cycle_names=documented_cycle_names)
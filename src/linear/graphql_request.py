@@ -1,38 +1,88 @@
-import json
+import re
 from typing import Optional, Dict
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape, Template
+from src.linear.query_registry import BUG_QUERY, CYCLE_INDEX_QUERY, CYCLE_ISSUES_QUERY, CYCLE_QUERY, \
+    ISSUE_SYNC_QUERY, OLDER_BUG_QUERY, TICKET_QUERY, GraphqlQuery, QueryRegistry
+
+EPOCH = "1970-01-01T00:00:00.000Z"
 
 
 class GraphqlRequest:
-    def __init__(self, linear_cycle_request_template: Optional[str],
-                 linear_ticket_request_template: Optional[str],
-                 linear_bug_request_template: Optional[str]):
-        self._linear_ticket_request_template = linear_ticket_request_template
-        self._linear_cycle_request_template = linear_cycle_request_template
-        self._linear_bug_request_template = linear_bug_request_template
-
-        self._env = Environment(loader=FileSystemLoader("resources"), autoescape=select_autoescape())
-
-    def build_linear_ticket_request(self, team_key: str, max_nb_tickets: int) -> Dict:
-        template = self._load_template(self._linear_ticket_request_template)
-        return json.loads(template.render({
-            "team_key": team_key,
-            "max_nb_tickets": max_nb_tickets
-        }))
-
-    def build_linear_bug_request(self, team_key: str, max_nb_tickets: int) -> Dict:
-        template = self._load_template(self._linear_bug_request_template)
-        return json.loads(template.render({
-            "team_key": team_key,
-            "max_nb_tickets": max_nb_tickets
-        }))
-
-    def build_linear_cycle_request(self, team_key: str) -> Dict:
-        template = self._load_template(self._linear_cycle_request_template)
-        return json.loads(template.render({
-            "team_key": team_key
-        }))
-
-    def _load_template(self, filepath: str) -> Template:
-        return self._env.get_template(filepath)
+    def __init__(self, query_registry: QueryRegistry):
+        self._query_registry = query_registry
+
+    def build_linear_ticket_request(self, team_key: str, max_nb_tickets: int, after: Optional[str] = None) -> Dict:
+        return self._query_registry.get(TICKET_QUERY).build_payload(variables={
+            "teamKey": team_key,
+            "first": max_nb_tickets,
+            "after": after
+        })
+
+    def build_linear_bug_request(self, team_key: str, max_nb_tickets: int, after: Optional[str] = None) -> Dict:
+        return self._query_registry.get(BUG_QUERY).build_payload(variables={
+            "teamKey": team_key,
+            "first": max_nb_tickets,
+            "after": after
+        })
+
+    def build_linear_older_bug_request(self, team_key: str, created_before: str, max_nb_tickets: int,
+                                       after: Optional[str] = None) -> Dict:
+        return self._query_registry.get(OLDER_BUG_QUERY).build_payload(variables={
+            "teamKey": team_key,
+            "createdBefore": created_before,
+            "first": max_nb_tickets,
+            "after": after
+        })
+
+    def build_linear_issue_sync_request(self, team_key: str, max_nb_tickets: int, after: Optional[str] = None,
+                                        updated_after: Optional[str] = None) -> Dict:
+        return self._query_registry.get(ISSUE_SYNC_QUERY).build_payload(variables={
+            "teamKey": team_key,
+            "first": max_nb_tickets,
+            "after": after,
+            "updatedAfter": updated_after or EPOCH
+        })
+
+    def build_linear_cycle_request(self, team_key: str, after_number: float, first: int, issues_first: int,
+                                   after: Optional[str] = None) -> Dict:
+        return self._query_registry.get(CYCLE_QUERY).build_payload(variables={
+            "teamKey": team_key,
+            "afterNumber": after_number,
+            "first": first,
+            "after": after,
+            "issuesFirst": issues_first
+        })
+
+    def build_linear_cycle_index_request(self, team_key: str, first: int, after: Optional[str] = None) -> Dict:
+        return self._query_registry.get(CYCLE_INDEX_QUERY).build_payload(variables={
+            "teamKey": team_key,
+            "first": first,
+            "after": after
+        })
+
+    def build_linear_cycle_issues_request(self, cycle_id: str, first: int, after: Optional[str] = None) -> Dict:
+        return self._query_registry.get(CYCLE_ISSUES_QUERY).build_payload(variables={
+            "cycleId": cycle_id,
+            "first": first,
+            "after": after
+        })
+
+    @staticmethod
+    def build_batch_request(payloads: Dict[str, Dict]) -> tuple[Dict, Dict[str, str]]:
+        variable_definitions = []
+        selections = []
+        variables = {}
+        root_fields = {}
+        for alias, payload in payloads.items():
+            query = GraphqlQuery.parse(document=payload['query'])
+            for name, variable_type in query.variable_types.items():
+                variable_definitions.append(f"${alias}_{name}: {variable_type}")
+                variables[f"{alias}_{name}"] = payload.get('variables', {}).get(name)
+
+            document = query.document
+            selection = document[document.index('{') + 1:document.rindex('}')].strip()
+            root_fields[alias] = query.root_field
+            selections.append(f"{alias}: " + re.sub(r'\$(\w+)', rf'${alias}_\1', selection))
+
+        header = f"query Batch({', '.join(variable_definitions)})" if variable_definitions else "query Batch"
+        return {"query": header + " {\n" + "\n".join(selections) + "\n}", "variables": variables}, root_fields
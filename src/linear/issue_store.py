@@ -0,0 +1,77 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from src.defaults import DEFAULT_ISSUE_STORE_PATH
+from src.linear.records import BUG_LABEL
+
+STORE_PAGE_SIZE = 250
+# the issues are keyed by their Linear id since the version 1, the previous versions keyed them by their identifier,
+# which changes when an issue moves to another team
+SCHEMA_VERSION = 1
+
+
+class IssueStore:
+    def __init__(self, path: str = DEFAULT_ISSUE_STORE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            if self._connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # the mirror is synchronized again from the whole history of the teams
+                self._connection.execute("DROP TABLE IF EXISTS issues")
+                self._connection.execute("DROP TABLE IF EXISTS sync_watermarks")
+                self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            # an issue moved to another team keeps its id, its row then moves to the team synchronizing it
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS issues ("
+                "id TEXT PRIMARY KEY, team_key TEXT NOT NULL, identifier TEXT NOT NULL, created_at TEXT NOT NULL, "
+                "updated_at TEXT NOT NULL, is_bug INTEGER NOT NULL, is_archived INTEGER NOT NULL, data TEXT NOT NULL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS issues_per_creation ON issues (team_key, is_archived, created_at)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sync_watermarks (team_key TEXT PRIMARY KEY, updated_at TEXT NOT NULL)")
+
+    def __enter__(self) -> 'IssueStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def get_watermark(self, team_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT updated_at FROM sync_watermarks WHERE team_key = ?",
+                                           (team_key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_watermark(self, team_key: str, updated_at: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO sync_watermarks (team_key, updated_at) VALUES (?, ?)",
+                                     (team_key, updated_at))
+
+    def merge(self, team_key: str, issues: list[Dict]) -> None:
+        rows = [(issue['id'], team_key, issue['identifier'], issue['createdAt'], issue['updatedAt'],
+                 int(BUG_LABEL in [label['name'] for label in issue['labels']['nodes']]),
+                 int(issue.get('archivedAt') is not None), json.dumps(issue, separators=(',', ':')))
+                for issue in issues]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO issues (id, team_key, identifier, created_at, updated_at, is_bug, "
+                "is_archived, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def iter_last_issues(self, team_key: str, max_nb_tickets: int, bugs_only: bool = False) -> Iterator[list[Dict]]:
+        query = "SELECT data FROM issues WHERE team_key = ? AND is_archived = 0"
+        if bugs_only:
+            query += " AND is_bug = 1"
+        query += " ORDER BY created_at DESC LIMIT ?"
+
+        with self._lock:
+            rows = self._connection.execute(query, (team_key, max_nb_tickets)).fetchall()
+        for index in range(0, len(rows), STORE_PAGE_SIZE):
+            yield [json.loads(data) for (data,) in rows[index:index + STORE_PAGE_SIZE]]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
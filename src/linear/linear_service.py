@@ -1,38 +1,303 @@
-from typing import Dict, Optional
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from typing import Any, Callable, Collection, Dict, Iterator, Optional
 
+from src.defaults import LINEAR_URL
 from src.http_client import HttpClient
+from src.json_stream import decode_items
 from src.linear.graphql_request import GraphqlRequest
+from src.linear.issue_store import IssueStore
+from src.linear.query_registry import QueryRegistry
+from src.linear.records import Cycle, Ticket
+from src.linear.response_cache import ResponseCache
 
-LINEAR_URL = "https://api.linear.app/graphql"
+LINEAR_MAX_PAGE_SIZE = 250
+
+TICKET_ISSUES = "tickets"
+BUG_ISSUES = "bugs"
+
+ISSUE_CACHE_TTL_SECONDS = 15 * 60
+CYCLE_CACHE_TTL_SECONDS = 60 * 60
+# a cycle node carries its whole scope histories and a nested connection of issues
+CYCLE_PAGE_SIZE = 10
+CYCLE_ISSUES_PAGE_SIZE = 50
 
 
 class LinearService:
-    def __init__(self, api_key: str, team_key: str, linear_cycle_request_template: Optional[str] = None,
-                 linear_ticket_request_template: Optional[str] = None,
-                 linear_bug_request_template: Optional[str] = None):
-        headers = {
+    def __init__(self, api_key: str, team_key: str, http_client: HttpClient, query_registry: QueryRegistry,
+                 response_cache: Optional[ResponseCache] = None,
+                 issue_store: Optional[IssueStore] = None,
+                 url: str = LINEAR_URL):
+        self._headers = {
             'Content-Type': "application/json",
             'Authorization': api_key
         }
-        self._http_client = HttpClient(headers=headers)
+        self._http_client = http_client
+        self._url = url
         self._team_key = team_key
-        self._graphql_request = GraphqlRequest(linear_cycle_request_template=linear_cycle_request_template,
-                                               linear_ticket_request_template=linear_ticket_request_template,
-                                               linear_bug_request_template=linear_bug_request_template)
+        self._response_cache = response_cache
+        self._issue_store = issue_store
+        self._prefetched_responses: Dict[str, Dict] = {}
+        self._shared_issues: Dict[str, tuple[int, list[Ticket]]] = {}
+        self._sync_lock = threading.Lock()
+        self._graphql_request = GraphqlRequest(query_registry=query_registry)
+
+    @property
+    def team_key(self) -> str:
+        return self._team_key
+
+    def get_last_tickets(self, max_nb_tickets: int) -> list[Ticket]:
+        return [ticket for page in self.iter_last_tickets(max_nb_tickets=max_nb_tickets) for ticket in page]
+
+    def get_last_bugs(self, max_nb_tickets: int) -> list[Ticket]:
+        return [ticket for page in self.iter_last_bugs(max_nb_tickets=max_nb_tickets) for ticket in page]
+
+    def build_first_ticket_page_request(self, max_nb_tickets: int) -> Dict:
+        return self._graphql_request.build_linear_ticket_request(
+            team_key=self._team_key, max_nb_tickets=min(max_nb_tickets, LINEAR_MAX_PAGE_SIZE))
+
+    def build_first_bug_page_request(self, max_nb_tickets: int) -> Dict:
+        return self._graphql_request.build_linear_bug_request(
+            team_key=self._team_key, max_nb_tickets=min(max_nb_tickets, LINEAR_MAX_PAGE_SIZE))
+
+    def build_first_cycle_index_page_request(self) -> Dict:
+        return self._graphql_request.build_linear_cycle_index_request(team_key=self._team_key,
+                                                                     first=LINEAR_MAX_PAGE_SIZE)
+
+    def prefetch_batch(self, operations: list[tuple['LinearService', Dict]]) -> None:
+        operations_per_alias = {
+            f"operation{index}": (linear_service, payload)
+            for index, (linear_service, payload) in enumerate(operations)
+            if not linear_service.is_cached(payload=payload)
+        }
+        if len(operations_per_alias) == 0:
+            return
+
+        batch_payload, root_fields = GraphqlRequest.build_batch_request(
+            payloads={alias: payload for alias, (_, payload) in operations_per_alias.items()})
+        data = self._http_client.post(url=self._url, payload=batch_payload, headers=self._headers,
+                                      response_json_path=['data'])
+
+        for alias, (linear_service, payload) in operations_per_alias.items():
+            linear_service.accept_prefetched(payload=payload, response={'data': {root_fields[alias]: data[alias]}})
+
+    def is_cached(self, payload: Dict) -> bool:
+        """Whether the response to `payload` is available without a request, prefetched or in the response cache."""
+        return self._payload_key(payload=payload) in self._prefetched_responses or (
+                self._response_cache is not None and
+                self._response_cache.contains(key=self._response_cache.build_key(team_key=self._team_key,
+                                                                                  payload=payload)))
+
+    def accept_prefetched(self, payload: Dict, response: Dict) -> None:
+        """Response to `payload` fetched by another request, used instead of sending `payload`."""
+        self._prefetched_responses[self._payload_key(payload=payload)] = response
+
+    def prefetch_issues(self, max_nb_tickets: int) -> None:
+        """Downloads the last tickets and bugs of the team once for the ticket and bug analyses. The first ticket and
+        bug pages come with a single request; the bugs are then taken from the first bug page or from the tickets,
+        whichever covers the longest history, and only the older bugs still missing are asked to Linear."""
+        self._shared_issues.clear()
+        if self._issue_store is not None:
+            self.sync_issues()
+            tickets = self._get_stored_issues(max_nb_tickets=max_nb_tickets, bugs_only=False)
+            bugs = self._get_stored_issues(max_nb_tickets=max_nb_tickets, bugs_only=True)
+        else:
+            self.prefetch_batch(operations=[(self, self.build_first_ticket_page_request(max_nb_tickets=max_nb_tickets)),
+                                            (self, self.build_first_bug_page_request(max_nb_tickets=max_nb_tickets))])
+            tickets = [ticket for page in self.iter_last_tickets(max_nb_tickets=max_nb_tickets) for ticket in page]
+            bugs = self._get_bugs(tickets=tickets, max_nb_tickets=max_nb_tickets)
+        self._shared_issues[TICKET_ISSUES] = (max_nb_tickets, tickets)
+        self._shared_issues[BUG_ISSUES] = (max_nb_tickets, bugs)
+
+    def iter_last_tickets(self, max_nb_tickets: int) -> Iterator[list[Ticket]]:
+        shared_tickets = self._take_shared_issues(kind=TICKET_ISSUES, max_nb_tickets=max_nb_tickets)
+        if shared_tickets is not None:
+            return iter([shared_tickets])
+        if self._issue_store is not None:
+            self.sync_issues()
+            pages = self._issue_store.iter_last_issues(team_key=self._team_key, max_nb_tickets=max_nb_tickets)
+            return self._to_tickets(pages=pages)
+        return self._iter_issue_pages(build_request=self._graphql_request.build_linear_ticket_request,
+                                      max_nb_tickets=max_nb_tickets, cache_ttl_seconds=ISSUE_CACHE_TTL_SECONDS,
+                                      item_factory=Ticket.from_json)
+
+    def iter_last_bugs(self, max_nb_tickets: int) -> Iterator[list[Ticket]]:
+        shared_bugs = self._take_shared_issues(kind=BUG_ISSUES, max_nb_tickets=max_nb_tickets)
+        if shared_bugs is not None:
+            return iter([shared_bugs])
+        if self._issue_store is not None:
+            self.sync_issues()
+            pages = self._issue_store.iter_last_issues(team_key=self._team_key, max_nb_tickets=max_nb_tickets,
+                                                       bugs_only=True)
+            return self._to_tickets(pages=pages)
+        return self._iter_issue_pages(build_request=self._graphql_request.build_linear_bug_request,
+                                      max_nb_tickets=max_nb_tickets, cache_ttl_seconds=ISSUE_CACHE_TTL_SECONDS,
+                                      item_factory=Ticket.from_json)
+
+    def get_cycle_data(self, documented_cycle_names: Collection[str] = ()) -> list[Cycle]:
+        """Past cycles of the team, from the first one missing from `documented_cycle_names`."""
+        after_number = self._get_cycle_watermark(documented_cycle_names=documented_cycle_names)
+        if after_number is None:
+            return []
+
+        build_request = partial(self._graphql_request.build_linear_cycle_request, team_key=self._team_key,
+                                after_number=after_number, first=CYCLE_PAGE_SIZE, issues_first=CYCLE_ISSUES_PAGE_SIZE)
+        cycles = []
+        for nodes in self._iter_connection(build_request=build_request, connection_path=['data', 'cycles'],
+                                           cache_ttl_seconds=CYCLE_CACHE_TTL_SECONDS):
+            for node in nodes:
+                self._fetch_remaining_uncompleted_issues(cycle_node=node)
+                cycles.append(Cycle.from_json(node))
+        return cycles
+
+    def sync_issues(self) -> None:
+        with self._sync_lock:
+            watermark = self._issue_store.get_watermark(team_key=self._team_key)
+            build_request = partial(self._graphql_request.build_linear_issue_sync_request, updated_after=watermark)
+
+            latest_update = watermark or ''
+            for issues in self._iter_issue_pages(build_request=build_request, max_nb_tickets=None):
+                self._issue_store.merge(team_key=self._team_key, issues=issues)
+                latest_update = max([latest_update] + [issue['updatedAt'] for issue in issues])
+
+            if latest_update:
+                self._issue_store.set_watermark(team_key=self._team_key, updated_at=latest_update)
+
+    def _take_shared_issues(self, kind: str, max_nb_tickets: int) -> Optional[list[Ticket]]:
+        """Issues of the shared download for `kind`, used once so that a later run downloads fresh issues."""
+        window, issues = self._shared_issues.pop(kind, (0, None))
+        return None if issues is None or window < max_nb_tickets else issues[:max_nb_tickets]
+
+    def _get_stored_issues(self, max_nb_tickets: int, bugs_only: bool) -> list[Ticket]:
+        pages = self._issue_store.iter_last_issues(team_key=self._team_key, max_nb_tickets=max_nb_tickets,
+                                                   bugs_only=bugs_only)
+        return [ticket for page in self._to_tickets(pages=pages) for ticket in page]
+
+    def _get_bugs(self, tickets: list[Ticket], max_nb_tickets: int) -> list[Ticket]:
+        """Last bugs of the team, from the prefetched first bug page or the bugs among the last `tickets`: each holds
+        every bug created since its oldest issue."""
+        first_bugs, bug_page_info = self._fetch_issue_page(
+            build_request=self._graphql_request.build_linear_bug_request, max_nb_tickets=max_nb_tickets, after=None,
+            cache_ttl_seconds=ISSUE_CACHE_TTL_SECONDS, item_factory=Ticket.from_json)
+        ticket_bugs = [ticket for ticket in tickets if ticket.is_bug]
+        if not bug_page_info['hasNextPage'] or len(tickets) < max_nb_tickets:
+            # one of them holds the whole bug history of the team
+            return (first_bugs if not bug_page_info['hasNextPage'] else ticket_bugs)[:max_nb_tickets]
+
+        bugs, oldest_issue = (ticket_bugs, tickets[-1]) if len(ticket_bugs) > len(first_bugs) else \
+            (first_bugs, first_bugs[-1])
+        if len(bugs) >= max_nb_tickets:
+            return bugs[:max_nb_tickets]
+
+        build_request = partial(self._graphql_request.build_linear_older_bug_request,
+                                created_before=oldest_issue.created_at.isoformat(timespec='milliseconds'))
+        return bugs + [bug for page in self._iter_issue_pages(build_request=build_request,
+                                                              max_nb_tickets=max_nb_tickets - len(bugs),
+                                                              cache_ttl_seconds=ISSUE_CACHE_TTL_SECONDS,
+                                                              item_factory=Ticket.from_json) for bug in page]
+
+    def _get_cycle_watermark(self, documented_cycle_names: Collection[str]) -> Optional[float]:
+        """Number right before the first undocumented past cycle, from the list of the cycle names and numbers, or
+        None when every past cycle is documented."""
+        build_request = partial(self._graphql_request.build_linear_cycle_index_request, team_key=self._team_key,
+                                first=LINEAR_MAX_PAGE_SIZE)
+        undocumented_numbers = [
+            node['number']
+            for nodes in self._iter_connection(build_request=build_request, connection_path=['data', 'cycles'],
+                                               cache_ttl_seconds=CYCLE_CACHE_TTL_SECONDS)
+            for node in nodes if node['name'] not in documented_cycle_names
+        ]
+        return min(undocumented_numbers) - 1 if undocumented_numbers else None
+
+    def _fetch_remaining_uncompleted_issues(self, cycle_node: Dict) -> None:
+        issues = cycle_node['uncompletedIssuesUponClose']
+        if not issues['pageInfo']['hasNextPage']:
+            return
+
+        build_request = partial(self._graphql_request.build_linear_cycle_issues_request, cycle_id=cycle_node['id'],
+                                first=LINEAR_MAX_PAGE_SIZE)
+        for nodes in self._iter_connection(build_request=build_request,
+                                           connection_path=['data', 'cycle', 'uncompletedIssuesUponClose'],
+                                           cache_ttl_seconds=CYCLE_CACHE_TTL_SECONDS,
+                                           after=issues['pageInfo']['endCursor']):
+            issues['nodes'].extend(nodes)
+
+    def _iter_connection(self, build_request: Callable[..., Dict], connection_path: list[str],
+                         cache_ttl_seconds: Optional[float], after: Optional[str] = None) -> Iterator[list[Dict]]:
+        while True:
+            nodes, page_info = self._post_items(payload=build_request(after=after),
+                                                items_path=connection_path + ['nodes'],
+                                                cache_ttl_seconds=cache_ttl_seconds, item_factory=None)
+            yield nodes
+            if not page_info['hasNextPage']:
+                return
+            after = page_info['endCursor']
+
+    @staticmethod
+    def _to_tickets(pages: Iterator[list[Dict]]) -> Iterator[list[Ticket]]:
+        for issues in pages:
+            yield [Ticket.from_json(issue) for issue in issues]
+
+    def _iter_issue_pages(self, build_request: Callable[..., Dict], max_nb_tickets: Optional[int],
+                          cache_ttl_seconds: Optional[float] = None,
+                          item_factory: Optional[Callable[[Dict], Any]] = None) -> Iterator[list]:
+        remaining = max_nb_tickets
+        fetch_page = partial(self._fetch_issue_page, build_request=build_request,
+                             cache_ttl_seconds=cache_ttl_seconds, item_factory=item_factory)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(copy_context().run, fetch_page, max_nb_tickets=remaining, after=None)
+            while next_page is not None:
+                nodes, page_info = next_page.result()
+                if remaining is not None:
+                    nodes = nodes[:remaining]
+                    remaining -= len(nodes)
+
+                next_page = None
+                if (remaining is None or remaining > 0) and page_info['hasNextPage']:
+                    next_page = executor.submit(copy_context().run, fetch_page, max_nb_tickets=remaining,
+                                                after=page_info['endCursor'])
+                yield nodes
 
-    def get_last_tickets(self, max_nb_tickets: int) -> Dict:
-        payload = self._graphql_request.build_linear_ticket_request(team_key=self._team_key,
-                                                                    max_nb_tickets=max_nb_tickets)
+    def _fetch_issue_page(self, build_request: Callable[..., Dict], max_nb_tickets: Optional[int],
+                          after: Optional[str], cache_ttl_seconds: Optional[float],
+                          item_factory: Optional[Callable[[Dict], Any]]) -> tuple[list, Dict]:
+        page_size = LINEAR_MAX_PAGE_SIZE if max_nb_tickets is None else min(max_nb_tickets, LINEAR_MAX_PAGE_SIZE)
+        payload = build_request(team_key=self._team_key, max_nb_tickets=page_size, after=after)
 
-        return self._http_client.post(url=LINEAR_URL, payload=payload, response_json_path=['data', 'issues', 'nodes'])
+        return self._post_items(payload=payload, items_path=['data', 'issues', 'nodes'],
+                                cache_ttl_seconds=cache_ttl_seconds, item_factory=item_factory)
 
-    def get_last_bugs(self, max_nb_tickets: int) -> Dict:
-        payload = self._graphql_request.build_linear_bug_request(team_key=self._team_key,
-                                                                 max_nb_tickets=max_nb_tickets)
+    def _post_items(self, payload: Dict, items_path: list[str], cache_ttl_seconds: Optional[float],
+                    item_factory: Optional[Callable[[Dict], Any]]) -> tuple[list, Dict]:
+        prefetched_response = self._prefetched_responses.pop(self._payload_key(payload=payload), None)
+        if prefetched_response is not None:
+            if self._response_cache is not None and cache_ttl_seconds is not None:
+                self._response_cache.put(key=self._response_cache.build_key(team_key=self._team_key, payload=payload),
+                                         value=json.dumps(prefetched_response, separators=(',', ':')).encode(),
+                                         ttl_seconds=cache_ttl_seconds)
+            connection = prefetched_response
+            for path in items_path[:-1]:
+                connection = connection[path]
+            items = connection[items_path[-1]]
+            return items if item_factory is None else [item_factory(item) for item in items], connection['pageInfo']
 
-        return self._http_client.post(url=LINEAR_URL, payload=payload, response_json_path=['data', 'issues', 'nodes'])
+        cache_key = None
+        if self._response_cache is not None and cache_ttl_seconds is not None:
+            cache_key = self._response_cache.build_key(team_key=self._team_key, payload=payload)
+            body = self._response_cache.get(key=cache_key)
+            if body is not None:
+                return decode_items(body=body, items_path=items_path, item_factory=item_factory)
 
-    def get_cycle_data(self):
-        payload = self._graphql_request.build_linear_cycle_request(team_key=self._team_key)
+        with self._http_client.post_stream(url=self._url, payload=payload, headers=self._headers) as stream:
+            body = stream.read()
+        result = decode_items(body=body, items_path=items_path, item_factory=item_factory)
+        if cache_key is not None:
+            self._response_cache.put(key=cache_key, value=body, ttl_seconds=cache_ttl_seconds)
+        return result
 
-        return self._http_client.post(url=LINEAR_URL, payload=payload, response_json_path=['data', 'cycles', 'nodes'])
+    @staticmethod
+    def _payload_key(payload: Dict) -> str:
+        return json.dumps(payload, sort_keys=True)
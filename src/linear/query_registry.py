@@ -0,0 +1,61 @@
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+RESOURCES_PATH = Path(__file__).resolve().parents[2] / "resources"
+
+TICKET_QUERY = "ticket"
+BUG_QUERY = "bug"
+OLDER_BUG_QUERY = "older_bug"
+ISSUE_SYNC_QUERY = "issue_sync"
+CYCLE_QUERY = "cycle"
+CYCLE_INDEX_QUERY = "cycle_index"
+CYCLE_ISSUES_QUERY = "cycle_issues"
+
+_OPERATION_PATTERN = re.compile(r'^\s*query\s+(\w+)\s*(?:\(([^)]*)\))?\s*\{\s*(\w+)')
+_VARIABLE_DEFINITION_PATTERN = re.compile(r'\$(\w+)\s*:\s*([\w!\[\]]+)')
+_VARIABLE_PATTERN = re.compile(r'\$(\w+)')
+
+
+class GraphqlQuery:
+    __slots__ = ('operation_name', 'document', 'root_field', 'variable_types')
+
+    def __init__(self, operation_name: str, document: str, root_field: str, variable_types: Dict[str, str]):
+        self.operation_name = operation_name
+        self.document = document
+        self.root_field = root_field
+        self.variable_types = variable_types
+
+    def build_payload(self, variables: Dict[str, Any]) -> Dict:
+        return {"query": self.document, "variables": variables}
+
+    @staticmethod
+    def parse(document: str) -> 'GraphqlQuery':
+        match = _OPERATION_PATTERN.match(document)
+        if match is None:
+            raise ValueError("a query document must start with a named query operation")
+        if document.count('{') != document.count('}'):
+            raise ValueError(f"unbalanced braces in query {match.group(1)}")
+
+        variable_types = dict(_VARIABLE_DEFINITION_PATTERN.findall(match.group(2) or ''))
+        body = document[match.end(2) if match.group(2) is not None else match.end(1):]
+        undeclared_variables = set(_VARIABLE_PATTERN.findall(body)) - variable_types.keys()
+        if undeclared_variables:
+            raise ValueError(f"undeclared variables {sorted(undeclared_variables)} in query {match.group(1)}")
+
+        return GraphqlQuery(operation_name=match.group(1), document=document.strip(), root_field=match.group(3),
+                            variable_types=variable_types)
+
+
+class QueryRegistry:
+    def __init__(self, query_files: Dict[str, Optional[str]], resources_path: Path = RESOURCES_PATH):
+        self._queries = {
+            name: GraphqlQuery.parse(document=(resources_path / query_file).read_text())
+            for name, query_file in query_files.items() if query_file is not None
+        }
+
+    def get(self, name: str) -> GraphqlQuery:
+        query = self._queries.get(name)
+        if query is None:
+            raise ValueError(f"no query document configured for '{name}'")
+        return query
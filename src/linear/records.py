@@ -0,0 +1,80 @@
+from array import array
+from datetime import datetime
+from sys import intern
+from typing import Dict, Optional
+
+BUG_LABEL = 'Bug'
+
+
+class Ticket:
+    __slots__ = ('identifier', 'title', 'url', 'state', 'project', 'labels', 'has_description', 'created_at',
+                 'started_at', 'completed_at')
+
+    def __init__(self, identifier: str, title: str, url: str, state: str, project: Optional[str],
+                 labels: tuple[str, ...], has_description: bool, created_at: Optional[datetime],
+                 started_at: Optional[datetime], completed_at: Optional[datetime]):
+        self.identifier = identifier
+        self.title = title
+        self.url = url
+        self.state = state
+        self.project = project
+        self.labels = labels
+        self.has_description = has_description
+        self.created_at = created_at
+        self.started_at = started_at
+        self.completed_at = completed_at
+
+    @property
+    def is_bug(self) -> bool:
+        return BUG_LABEL in self.labels
+
+    @staticmethod
+    def from_json(node: Dict) -> 'Ticket':
+        project = node.get('project')
+        labels = node.get('labels')
+        return Ticket(
+            identifier=node['identifier'],
+            title=node['title'],
+            url=node['url'],
+            state=intern(node['state']['name']),
+            project=None if project is None else intern(project['name'] or ''),
+            labels=() if labels is None else tuple(intern(label['name']) for label in labels['nodes']),
+            has_description=bool(node.get('description')),
+            created_at=_parse_datetime(node.get('createdAt')),
+            started_at=_parse_datetime(node.get('startedAt')),
+            completed_at=_parse_datetime(node.get('completedAt'))
+        )
+
+
+class Cycle:
+    __slots__ = ('name', 'starts_at', 'ends_at', 'scope_history', 'completed_scope_history',
+                 'in_progress_scope_history', 'progress', 'uncompleted_issues')
+
+    def __init__(self, name: str, starts_at: datetime, ends_at: datetime, scope_history: array,
+                 completed_scope_history: array, in_progress_scope_history: array, progress: float,
+                 uncompleted_issues: list[Ticket]):
+        self.name = name
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+        self.scope_history = scope_history
+        self.completed_scope_history = completed_scope_history
+        self.in_progress_scope_history = in_progress_scope_history
+        self.progress = progress
+        self.uncompleted_issues = uncompleted_issues
+
+    @staticmethod
+    def from_json(node: Dict) -> 'Cycle':
+        return Cycle(
+            name=node['name'],
+            starts_at=_parse_datetime(node['startsAt']),
+            ends_at=_parse_datetime(node['endsAt']),
+            scope_history=array('d', node['scopeHistory']),
+            completed_scope_history=array('d', node['completedScopeHistory']),
+            in_progress_scope_history=array('d', node['inProgressScopeHistory']),
+            progress=float(node['progress']),
+            uncompleted_issues=[Ticket.from_json(issue) for issue in node['uncompletedIssuesUponClose']['nodes']]
+        )
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return None if value is None else datetime.fromisoformat(value)
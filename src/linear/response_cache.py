@@ -0,0 +1,92 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.defaults import DEFAULT_CACHE_MAX_SIZE_MB, DEFAULT_CACHE_PATH
+
+# the raw response bodies are stored since the version 1, the previous versions stored the decoded JSON as text
+SCHEMA_VERSION = 1
+
+
+class ResponseCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_size_mb: int = DEFAULT_CACHE_MAX_SIZE_MB,
+                 read_enabled: bool = True):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._max_size_bytes = max_size_mb * 1024 * 1024
+        self._read_enabled = read_enabled
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            if self._connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._connection.execute("DROP TABLE IF EXISTS responses")
+                self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)")
+
+    def __enter__(self) -> 'ResponseCache':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @staticmethod
+    def build_key(team_key: str, payload: Dict) -> str:
+        serialized_payload = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f"{team_key}\n{serialized_payload}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self._read_enabled:
+            return None
+
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT value, expires_at FROM responses WHERE key = ?",
+                                           (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return value
+
+    def contains(self, key: str) -> bool:
+        if not self._read_enabled:
+            return False
+
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM responses WHERE key = ? AND expires_at > ?",
+                                            (key, time.time())).fetchone() is not None
+
+    def put(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl_seconds, now))
+            self._evict(now=now)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _evict(self, now: float) -> None:
+        self._connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self._max_size_bytes:
+            return
+
+        evicted_keys = []
+        for key, size in self._connection.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total_size <= self._max_size_bytes:
+                break
+            evicted_keys.append((key,))
+            total_size -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
@@ -1,19 +1,218 @@
-from src.analysis_service.bug_analysis_service import BugAnalysisService
-from src.analysis_service.cycle_analysis_service import CycleAnalysisService
-from src.analysis_service.ticket_analysis_service import TicketAnalysisService
+import logging
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from src.analysis_service.analysis_service import AnalysisService
+from src.analysis_service.registry import load_analysis_service
+from src.analysis_service.snapshot_store import SnapshotStore
+from src.async_http_client import AsyncHttpClient
+from src.http_client import HttpClient
+from src.lazy_import import lazy_import
+from src.linear.issue_store import IssueStore
+from src.linear.linear_service import LinearService
+from src.linear.query_registry import (BUG_QUERY, CYCLE_INDEX_QUERY, CYCLE_ISSUES_QUERY, CYCLE_QUERY, ISSUE_SYNC_QUERY,
+                                       OLDER_BUG_QUERY, TICKET_QUERY, QueryRegistry)
+from src.linear.response_cache import ResponseCache
+from src.metrics import LINEAR_FETCH_PHASE, PREFETCH_MODE, RunMetrics
+from src.notion.cycle_registry import CycleRegistry
+from src.notion.notion_service import NotionService
 from src.properties import Properties
+from src.scheduler import Scheduler
 
-analysis_services = {
-    "BUG": BugAnalysisService,
-    "CYCLE": CycleAnalysisService,
-    "TICKET": TicketAnalysisService
-}
+asyncio = lazy_import('asyncio')
+if TYPE_CHECKING:
+    from src import import_time, profiling
+else:
+    # only loaded with --import-time-report and --profile, cProfile and pstats being slow to import
+    import_time = lazy_import('src.import_time')
+    profiling = lazy_import('src.profiling')
 
 
 def main():
     properties = Properties()
+    if properties.import_time_report:
+        print(import_time.import_time_report(modes=properties.mode, use_async=properties.use_async))
+        return
+
+    metrics = RunMetrics()
+    with ExitStack() as exit_stack:
+        exit_stack.callback(metrics.write, json_path=properties.metrics_json_path,
+                            prometheus_path=properties.metrics_prometheus_path)
+        http_client = exit_stack.enter_context(HttpClient(
+            pool_size=properties.http_pool_size, connect_timeout=properties.http_connect_timeout,
+            read_timeout=properties.http_read_timeout, max_retries=properties.http_max_retries, metrics=metrics))
+        # a daemon run would be served the responses cached by the previous run of its mode, the interval of a mode
+        # being as short as the lifetime of the cached responses
+        response_cache = exit_stack.enter_context(ResponseCache(
+            path=properties.cache_path, max_size_mb=properties.cache_max_size_mb,
+            read_enabled=not properties.refresh_cache)) if properties.use_cache and not properties.daemon else None
+        issue_store = exit_stack.enter_context(IssueStore(
+            path=properties.issue_store_path)) if properties.issue_store_path is not None else None
+        snapshot_store = exit_stack.enter_context(SnapshotStore(
+            path=properties.snapshot_store_path)) if properties.snapshot_store_path is not None else None
+        if properties.cycle_registry_path is not None:
+            cycle_registry = CycleRegistry(path=properties.cycle_registry_path,
+                                           read_enabled=not properties.refresh_cache)
+        elif properties.daemon:
+            # the cycles documented by the previous runs of the daemon are kept in memory instead of being scanned again
+            cycle_registry = CycleRegistry(path=None)
+        else:
+            cycle_registry = None
+
+        query_registry = QueryRegistry(query_files={
+            TICKET_QUERY: properties.linear_ticket_request_template,
+            BUG_QUERY: properties.linear_bug_request_template,
+            OLDER_BUG_QUERY: properties.linear_older_bug_request_template,
+            ISSUE_SYNC_QUERY: properties.linear_issue_sync_request_template,
+            CYCLE_QUERY: properties.linear_cycle_request_template,
+            CYCLE_INDEX_QUERY: properties.linear_cycle_index_request_template,
+            CYCLE_ISSUES_QUERY: properties.linear_cycle_issues_request_template
+        })
+        linear_services = [
+            LinearService(api_key=properties.linear_api_key, team_key=team_key, http_client=http_client,
+                          query_registry=query_registry,
+                          response_cache=response_cache,
+                          issue_store=issue_store,
+                          url=properties.linear_url)
+            for team_key in properties.team_keys
+        ]
+        notion_service = NotionService(api_key=properties.notion_api_key, http_client=http_client,
+                                       cycle_registry=cycle_registry, url=properties.notion_url)
+        analysis_services = {mode: load_analysis_service(mode) for mode in properties.mode}
+
+        def create_analyses(modes: list[str]) -> list[tuple[str, str, AnalysisService]]:
+            return [
+                (linear_service.team_key, mode, analysis_services[mode](properties=properties,
+                                                                        linear_service=linear_service,
+                                                                        notion_service=notion_service,
+                                                                        metrics=metrics,
+                                                                        snapshot_store=snapshot_store))
+                for linear_service in linear_services for mode in modes
+            ]
+
+        if properties.daemon:
+            for option, is_set in [('--async', properties.use_async), ('--profile', properties.profile),
+                                   ('--batch-linear-queries', properties.batch_linear_queries)]:
+                if is_set:
+                    logging.warning(f"{option} is ignored in daemon mode")
+            run_daemon(properties=properties, metrics=metrics, create_analyses=create_analyses)
+            return
+
+        analyses = create_analyses(modes=properties.mode)
+        if properties.batch_linear_queries:
+            run_isolated(run_prefetch, label="Linear batch", metrics=metrics,
+                         team_key=",".join(properties.team_keys), prefetch=linear_services[0].prefetch_batch,
+                         operations=batch_operations(properties=properties, linear_services=linear_services))
+        if 'TICKET' in properties.mode and 'BUG' in properties.mode:
+            # the ticket and bug analyses of a team share one download of its last issues
+            with ThreadPoolExecutor(max_workers=properties.max_workers) as executor:
+                for linear_service in linear_services:
+                    executor.submit(run_isolated, run_prefetch, label=f"{linear_service.team_key} issue prefetch",
+                                    metrics=metrics, team_key=linear_service.team_key,
+                                    prefetch=linear_service.prefetch_issues,
+                                    max_nb_tickets=properties.max_nb_tickets_to_analyze)
+
+        if properties.profile:
+            profiler = profiling.Profiler(output_dir=properties.profile_dir, sampling=properties.profile_sampling)
+            if properties.use_async:
+                logging.warning("--async is ignored when profiling, the analyses run on threads")
+            nb_failures = run_in_pool(analyses=analyses,
+                                      max_workers=properties.max_workers if profiler.sampling else 1,
+                                      profiler=profiler)
+        elif properties.use_async:
+            nb_failures = asyncio.run(run_async(analyses=analyses, http_client=http_client,
+                                                max_concurrency=properties.max_concurrency))
+        else:
+            nb_failures = run_in_pool(analyses=analyses, max_workers=properties.max_workers)
+
+    if nb_failures > 0:
+        logging.error(f"{nb_failures} analyses out of {len(analyses)} failed")
+        sys.exit(1)
+
+
+def batch_operations(properties: Properties, linear_services: list[LinearService]) -> list[tuple[LinearService, Dict]]:
+    operations = []
+    for linear_service in linear_services:
+        if properties.issue_store_path is None and 'TICKET' in properties.mode:
+            operations.append((linear_service, linear_service.build_first_ticket_page_request(
+                max_nb_tickets=properties.max_nb_tickets_to_analyze)))
+        if properties.issue_store_path is None and 'BUG' in properties.mode:
+            operations.append((linear_service, linear_service.build_first_bug_page_request(
+                max_nb_tickets=properties.max_nb_tickets_to_analyze)))
+        if 'CYCLE' in properties.mode:
+            operations.append((linear_service, linear_service.build_first_cycle_index_page_request()))
+    return operations
+
+
+def run_prefetch(metrics: RunMetrics, team_key: str, prefetch: Callable, **kwargs) -> None:
+    """Runs a download shared by several analyses, labelled apart from them as a `PREFETCH` run of `team_key`."""
+    with metrics.run(team_key=team_key, mode=PREFETCH_MODE), metrics.phase(LINEAR_FETCH_PHASE):
+        prefetch(**kwargs)
+
+
+def run_daemon(properties: Properties, metrics: RunMetrics,
+               create_analyses: Callable[[list[str]], list[tuple[str, str, AnalysisService]]]) -> None:
+    """Analyzes each mode at its own interval, with the services, HTTP connections and caches kept from a run to the
+    next, until SIGINT or SIGTERM; the analyses running at that time are completed."""
+    def run_mode(mode: str) -> None:
+        analyses = create_analyses(modes=[mode])
+        nb_failures = run_in_pool(analyses=analyses, max_workers=properties.max_workers)
+        metrics.write(json_path=properties.metrics_json_path, prometheus_path=properties.metrics_prometheus_path)
+        if nb_failures > 0:
+            logging.error(f"{nb_failures} analyses out of {len(analyses)} failed")
+
+    scheduler = Scheduler()
     for mode in properties.mode:
-        analysis_services[mode](properties=properties).run()
+        scheduler.add_job(name=f"{mode} analyses", interval_seconds=properties.intervals_seconds[mode],
+                          func=partial(run_mode, mode=mode))
+
+    def stop(signal_number: int, _) -> None:
+        logging.info(f"{signal.Signals(signal_number).name} received, stopping once the running analyses are done")
+        scheduler.stop()
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, stop)
+    scheduler.run()
+
+
+def run_in_pool(analyses: list[tuple[str, str, AnalysisService]], max_workers: int,
+                profiler: Optional['profiling.Profiler'] = None) -> int:
+    def run_analysis(team_key: str, mode: str, service: AnalysisService) -> bool:
+        if profiler is None:
+            return run_isolated(service.run, label=f"{team_key} {mode}")
+        with profiler.profile(label=f"{team_key}_{mode}"):
+            return run_isolated(service.run, label=f"{team_key} {mode}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda analysis: run_analysis(*analysis), analyses)
+        return sum(1 for is_success in results if not is_success)
+
+
+def run_isolated(func: Callable, label: str, **kwargs) -> bool:
+    try:
+        func(**kwargs)
+        return True
+    except Exception:
+        logging.exception(f"{label} failed")
+        return False
+
+
+async def run_async(analyses: list[tuple[str, str, AnalysisService]], http_client: HttpClient,
+                    max_concurrency: int) -> int:
+    async_http_client = AsyncHttpClient(http_client=http_client, max_concurrency=max_concurrency)
+    results = await asyncio.gather(*[service.run_async(async_http_client=async_http_client)
+                                     for _, _, service in analyses], return_exceptions=True)
+
+    nb_failures = 0
+    for (team_key, mode, _), result in zip(analyses, results):
+        if isinstance(result, BaseException):
+            logging.error(f"{team_key} {mode} failed", exc_info=result)
+            nb_failures += 1
+    return nb_failures
 
 
 if __name__ == "__main__":
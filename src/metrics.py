@@ -0,0 +1,269 @@
+import bisect
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+LINEAR_FETCH_PHASE = "linear_fetch"
+AGGREGATION_PHASE = "aggregation"
+PAGE_BUILD_PHASE = "page_build"
+NOTION_QUERY_PHASE = "notion_query"
+NOTION_WRITE_PHASE = "notion_write"
+# the label of the requests downloading ahead of the analyses the data they share
+PREFETCH_MODE = "PREFETCH"
+
+LATENCY_BUCKETS_SECONDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_PREFIX = "linear_stats"
+
+_ID_PATTERN = re.compile(r'/[0-9a-fA-F-]{32,36}(?=/|$)')
+
+_labels: ContextVar[tuple[str, str]] = ContextVar('metrics_labels', default=('', ''))
+
+T = TypeVar('T')
+
+
+class LatencyHistogram:
+    __slots__ = ('bucket_counts', 'count', 'sum')
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS_SECONDS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(LATENCY_BUCKETS_SECONDS, seconds)
+        if index < len(self.bucket_counts):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative_counts(self) -> list[tuple[str, int]]:
+        counts = []
+        total = 0
+        for upper_bound, bucket_count in zip(LATENCY_BUCKETS_SECONDS, self.bucket_counts):
+            total += bucket_count
+            counts.append((str(upper_bound), total))
+        counts.append(("+Inf", self.count))
+        return counts
+
+
+class EndpointMetrics:
+    __slots__ = ('requests_per_status', 'retries', 'bytes_sent', 'bytes_received', 'latency')
+
+    def __init__(self):
+        self.requests_per_status: Dict[str, int] = {}
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+
+class RunMetrics:
+    """Thread-safe collector of the wall time of the analysis phases and of the HTTP traffic.
+
+    Everything is labelled with the (team, mode) of the analysis being run in the current context. The time of a phase
+    excludes the time of the phases nested in it within the same thread, so that the phases of a run add up.
+
+    The run summaries (wall time, phases and traffic) describe the latest execution of each (team, mode), e.g. in daemon
+    mode, while the per-endpoint HTTP counters accumulate over all of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._run_seconds: Dict[tuple[str, str], float] = {}
+        self._run_success: Dict[tuple[str, str], bool] = {}
+        self._phase_seconds: Dict[tuple[str, str, str], float] = {}
+        self._endpoints: Dict[tuple[str, str, str], EndpointMetrics] = {}
+        self._run_traffic_baselines: Dict[tuple[str, str], Dict[str, int]] = {}
+
+    @contextmanager
+    def run(self, team_key: str, mode: str) -> Iterator[None]:
+        token = _labels.set((team_key, mode))
+        with self._lock:
+            for key in [key for key in self._phase_seconds if key[:2] == (team_key, mode)]:
+                del self._phase_seconds[key]
+            self._run_traffic_baselines[(team_key, mode)] = self._traffic(team_key=team_key, mode=mode)
+        start = time.perf_counter()
+        success = False
+        try:
+            yield
+            success = True
+        finally:
+            with self._lock:
+                self._run_seconds[(team_key, mode)] = time.perf_counter() - start
+                self._run_success[(team_key, mode)] = success
+            _labels.reset(token)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stack = self._phase_stack()
+        now = time.perf_counter()
+        if stack:
+            self._add_phase_time(name=stack[-1][0], seconds=now - stack[-1][1])
+        stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._add_phase_time(name=name, seconds=now - stack.pop()[1])
+            if stack:
+                stack[-1][1] = now
+
+    def timed(self, name: str, func: Callable[..., T]) -> Callable[..., T]:
+        @wraps(func)
+        def timed_func(*args, **kwargs) -> T:
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return timed_func
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record_request(self, method: str, url: str, status: str, seconds: float, bytes_sent: int,
+                       retried: bool) -> None:
+        with self._lock:
+            endpoint = self._endpoint(method=method, url=url)
+            endpoint.requests_per_status[status] = endpoint.requests_per_status.get(status, 0) + 1
+            endpoint.bytes_sent += bytes_sent
+            endpoint.retries += int(retried)
+            endpoint.latency.observe(seconds)
+
+    def record_bytes_received(self, method: str, url: str, nb_bytes: int) -> None:
+        with self._lock:
+            self._endpoint(method=method, url=url).bytes_received += nb_bytes
+
+    def summary(self) -> Dict:
+        with self._lock:
+            runs = []
+            for (team_key, mode), seconds in sorted(self._run_seconds.items()):
+                traffic = self._traffic(team_key=team_key, mode=mode)
+                baseline = self._run_traffic_baselines.get((team_key, mode), {})
+                runs.append({
+                    "team_key": team_key,
+                    "mode": mode,
+                    "success": self._run_success[(team_key, mode)],
+                    "seconds": seconds,
+                    "phases": {phase: phase_seconds
+                               for (phase_team_key, phase_mode, phase), phase_seconds in self._phase_seconds.items()
+                               if (phase_team_key, phase_mode) == (team_key, mode)},
+                    **{name: value - baseline.get(name, 0) for name, value in traffic.items()}
+                })
+
+            return {
+                "runs": runs,
+                "endpoints": [{
+                    "team_key": team_key,
+                    "mode": mode,
+                    "endpoint": endpoint,
+                    "requests_per_status": dict(metrics.requests_per_status),
+                    "retries": metrics.retries,
+                    "bytes_sent": metrics.bytes_sent,
+                    "bytes_received": metrics.bytes_received,
+                    "latency_seconds": {
+                        "buckets": dict(metrics.latency.cumulative_counts()),
+                        "count": metrics.latency.count,
+                        "sum": metrics.latency.sum
+                    }
+                } for (team_key, mode, endpoint), metrics in sorted(self._endpoints.items())]
+            }
+
+    def to_prometheus(self) -> str:
+        """Each metric family is written as its TYPE line followed by all of its samples, as the format requires."""
+        summary = self.summary()
+        families = {name: (metric_type, []) for name, metric_type in [
+            ("run_seconds", "gauge"), ("run_success", "gauge"), ("phase_seconds", "gauge"),
+            ("http_requests_total", "counter"), ("http_retries_total", "counter"),
+            ("http_sent_bytes_total", "counter"), ("http_received_bytes_total", "counter"),
+            ("http_request_duration_seconds", "histogram")
+        ]}
+        for run in summary['runs']:
+            labels = {'team': run['team_key'], 'mode': run['mode']}
+            families["run_seconds"][1].append(_sample("run_seconds", labels, run['seconds']))
+            families["run_success"][1].append(_sample("run_success", labels, int(run['success'])))
+            for phase, seconds in sorted(run['phases'].items()):
+                families["phase_seconds"][1].append(_sample("phase_seconds", labels | {'phase': phase}, seconds))
+
+        for endpoint in summary['endpoints']:
+            labels = {'team': endpoint['team_key'], 'mode': endpoint['mode'], 'endpoint': endpoint['endpoint']}
+            for status, count in sorted(endpoint['requests_per_status'].items()):
+                families["http_requests_total"][1].append(
+                    _sample("http_requests_total", labels | {'status': status}, count))
+            families["http_retries_total"][1].append(_sample("http_retries_total", labels, endpoint['retries']))
+            families["http_sent_bytes_total"][1].append(
+                _sample("http_sent_bytes_total", labels, endpoint['bytes_sent']))
+            families["http_received_bytes_total"][1].append(
+                _sample("http_received_bytes_total", labels, endpoint['bytes_received']))
+            latency = endpoint['latency_seconds']
+            histogram = families["http_request_duration_seconds"][1]
+            for upper_bound, count in latency['buckets'].items():
+                histogram.append(_sample("http_request_duration_seconds_bucket", labels | {'le': upper_bound}, count))
+            histogram.append(_sample("http_request_duration_seconds_count", labels, latency['count']))
+            histogram.append(_sample("http_request_duration_seconds_sum", labels, latency['sum']))
+
+        lines = []
+        for name, (metric_type, samples) in families.items():
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {metric_type}")
+            lines += samples
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+        with self._write_lock:
+            if json_path is not None:
+                Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+                Path(json_path).write_text(json.dumps(self.summary(), indent=2))
+            if prometheus_path is not None:
+                Path(prometheus_path).parent.mkdir(parents=True, exist_ok=True)
+                Path(prometheus_path).write_text(self.to_prometheus())
+
+    def _phase_stack(self) -> list[list]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add_phase_time(self, name: str, seconds: float) -> None:
+        team_key, mode = _labels.get()
+        with self._lock:
+            key = (team_key, mode, name)
+            self._phase_seconds[key] = self._phase_seconds.get(key, 0.0) + seconds
+
+    def _traffic(self, team_key: str, mode: str) -> Dict[str, int]:
+        endpoints = [metrics for (endpoint_team_key, endpoint_mode, _), metrics in self._endpoints.items()
+                     if (endpoint_team_key, endpoint_mode) == (team_key, mode)]
+        return {
+            "requests": sum(sum(metrics.requests_per_status.values()) for metrics in endpoints),
+            "retries": sum(metrics.retries for metrics in endpoints),
+            "bytes_sent": sum(metrics.bytes_sent for metrics in endpoints),
+            "bytes_received": sum(metrics.bytes_received for metrics in endpoints)
+        }
+
+    def _endpoint(self, method: str, url: str) -> EndpointMetrics:
+        team_key, mode = _labels.get()
+        key = (team_key, mode, f"{method.upper()} {_ID_PATTERN.sub('/{id}', url.split('?', 1)[0])}")
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = EndpointMetrics()
+        return endpoint
+
+
+def _sample(name: str, labels: Dict[str, str], value: float) -> str:
+    formatted_labels = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+    return f"{PROMETHEUS_PREFIX}_{name}{{{formatted_labels}}} {value}"
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,26 @@
+from typing import Dict, Optional
+
+from src.async_http_client import AsyncHttpClient
+from src.metrics import NOTION_QUERY_PHASE, NOTION_WRITE_PHASE, RunMetrics
+from src.notion.notion_service import NotionService
+
+
+class AsyncNotionService:
+    def __init__(self, notion_service: NotionService, async_http_client: AsyncHttpClient,
+                 metrics: Optional[RunMetrics] = None):
+        self._notion_service = notion_service
+        self._async_http_client = async_http_client
+        self._metrics = RunMetrics() if metrics is None else metrics
+
+    async def insert_notion_page(self, payload: Dict) -> Dict:
+        return await self._async_http_client.run(
+            self._metrics.timed(NOTION_WRITE_PHASE, self._notion_service.insert_notion_page), payload=payload)
+
+    async def get_documented_cycles(self, database_id: str, team_key: str) -> Dict[str, str]:
+        return await self._async_http_client.run(
+            self._metrics.timed(NOTION_QUERY_PHASE, self._notion_service.get_documented_cycles),
+            database_id=database_id, team_key=team_key)
+
+    def register_cycle_doc(self, database_id: str, team_key: str, cycle_name: str, page_id: str) -> None:
+        self._notion_service.register_cycle_doc(database_id=database_id, team_key=team_key, cycle_name=cycle_name,
+                                                page_id=page_id)
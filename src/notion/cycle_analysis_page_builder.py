@@ -1,15 +1,20 @@
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Iterator
 
+import numpy as np
+
+from src.linear.records import Cycle
 from src.notion.document_builder import DocumentBuilder
 
 COVER_URL = "https://images.unsplash.com/photo-1593510987185-1ec2256148a3"
 ICON = "🔎"
+# keeps the mermaid code of a chart within the 2000 characters of a Notion rich text
+MAX_XYCHART_POINTS = 100
 
 
 class CycleAnalysisPageBuilder(DocumentBuilder):
     def __init__(self, database_id: str, team_key: str, inspection_date: datetime, cycle_name: str,
-                 cycle_data: Dict):
+                 cycle_data: Cycle):
         super().__init__(icon=ICON, cover_url=COVER_URL, database_id=database_id, team_key=team_key,
                          inspection_date=inspection_date,
                          title=team_key + " - " + cycle_name,
@@ -28,53 +33,65 @@ class CycleAnalysisPageBuilder(DocumentBuilder):
             }
         }
 
-    def _children_block(self) -> Dict:
-        children = []
-        children.extend(self._iteration_summary_blocks(self._cycle_data))
-        children.append(self._divider_block())
-        children.extend(self._iteration_evolution_blocks(self._cycle_data))
-        children.append(self._divider_block())
-        children.extend(self._ticket_details_blocks("Details of the uncompleted tickets",
-                                                    self._cycle_data['uncompletedIssuesUponClose']['nodes']))
-
-        return {
-            'children': children[:100]
-        }
+    def _iter_children(self) -> Iterator[Dict]:
+        yield from self._iteration_summary_blocks(self._cycle_data)
+        yield self._divider_block()
+        yield from self._iteration_evolution_blocks(self._cycle_data)
+        yield self._divider_block()
+        yield from self._ticket_details_blocks("Details of the uncompleted tickets",
+                                               self._cycle_data.uncompleted_issues)
 
-    def _iteration_summary_blocks(self, iteration_data: Dict):
-        children = [
+    def _iteration_summary_blocks(self, iteration_data: Cycle):
+        scope_history = np.frombuffer(iteration_data.scope_history, dtype=np.float64)
+        scope_variations = np.diff(scope_history)
+        scope_added = scope_variations[scope_variations > 0].sum()
+        scope_removed = (-scope_variations[scope_variations < 0]).sum()
+        return [
             self._h1_block("Summary"),
-            self._paragraph_with_bold_key_block("Date of beginning. ", iteration_data['startsAt']),
-            self._paragraph_with_bold_key_block("Date of end. ", iteration_data['endsAt']),
+            self._paragraph_with_bold_key_block("Date of beginning. ", self._format_date(iteration_data.starts_at)),
+            self._paragraph_with_bold_key_block("Date of end. ", self._format_date(iteration_data.ends_at)),
             self._paragraph_with_bold_key_block("Max nb of tickets in the cycle. ",
-                                                str(max(iteration_data['scopeHistory'])))
+                                                self._format_number(scope_history.max())),
+            self._paragraph_with_bold_key_block("Tickets added after the beginning. ",
+                                                self._format_number(scope_added)),
+            self._paragraph_with_bold_key_block("Tickets removed after the beginning. ",
+                                                self._format_number(scope_removed)),
+            self._paragraph_with_bold_key_block(
+                "Nb of completed tickets. ", self._format_number(iteration_data.completed_scope_history[-1])),
+            self._paragraph_with_bold_key_block("Progress score. ", "{:.4f}".format(round(iteration_data.progress, 4)))
         ]
-        scope_added = 0
-        scope_removed = 0
-        previous_hist = -1
-        for hist in iteration_data['scopeHistory']:
-            if previous_hist >= 0:
-                if hist > previous_hist:
-                    scope_added += hist - previous_hist
-                else:
-                    scope_removed += previous_hist - hist
-            previous_hist = hist
-        children.append(self._paragraph_with_bold_key_block("Tickets added after the beginning. ", str(scope_added)))
-        children.append(
-            self._paragraph_with_bold_key_block("Tickets removed after the beginning. ", str(scope_removed)))
-        children.append(self._paragraph_with_bold_key_block("Nb of completed tickets. ",
-                                                            str(iteration_data['completedScopeHistory'][-1])))
-        children.append(self._paragraph_with_bold_key_block("Progress score. ",
-                                                            "{:.4f}".format(round(iteration_data['progress'], 4))))
-        return children
 
-    def _iteration_evolution_blocks(self, iteration_data: Dict):
+    def _iteration_evolution_blocks(self, iteration_data: Cycle):
         return [
             self._h1_block("History over time"),
             self._h2_block("Evolution of the nb of tickets in the iteration over time"),
-            self._xychart_block("nb tickets over time", iteration_data["scopeHistory"]),
+            self._history_xychart_block("nb tickets over time", iteration_data.scope_history),
             self._h2_block("Evolution of the nb of tickets in progress in the iteration over time"),
-            self._xychart_block("nb tickets in progress over time", iteration_data["inProgressScopeHistory"]),
+            self._history_xychart_block("nb tickets in progress over time", iteration_data.in_progress_scope_history),
             self._h2_block("Evolution of the nb of tickets resolved in the iteration over time"),
-            self._xychart_block("nb tickets completed over time", iteration_data["completedScopeHistory"])
+            self._history_xychart_block("nb tickets completed over time", iteration_data.completed_scope_history)
         ]
+
+    @staticmethod
+    def _history_xychart_block(title: str, history_values) -> Dict:
+        values = np.frombuffer(history_values, dtype=np.float64)
+        indexes = CycleAnalysisPageBuilder._downsample(values=values, max_nb_points=MAX_XYCHART_POINTS)
+        return DocumentBuilder._xychart_block(title, values[indexes].tolist(),
+                                              x_axis_labels=[f"d{index}" for index in indexes.tolist()])
+
+    @staticmethod
+    def _downsample(values: np.ndarray, max_nb_points: int) -> np.ndarray:
+        """Indexes of at most `max_nb_points` values, in order: the first and last values, and the min and max of each
+        of the equal-sized buckets splitting the series, so that the peaks and the scale of the chart are kept."""
+        nb_values = len(values)
+        if nb_values <= max_nb_points:
+            return np.arange(nb_values)
+
+        nb_buckets = (max_nb_points - 2) // 2
+        bucket_bounds = np.linspace(0, nb_values, nb_buckets + 1).astype(np.intp)
+        bucket_ids = np.repeat(np.arange(nb_buckets), np.diff(bucket_bounds))
+        # sorted by bucket then by value, each bucket keeps its bounds and starts with its min and ends with its max
+        order = np.lexsort((values, bucket_ids))
+        return np.unique(np.concatenate((
+            [0, nb_values - 1], order[bucket_bounds[:-1]], order[bucket_bounds[1:] - 1]
+        )))
@@ -0,0 +1,47 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class CycleRegistry:
+    """Notion pages of the documented cycles, per database and team, saved in `path` unless it is None."""
+
+    def __init__(self, path: Optional[str], read_enabled: bool = True):
+        self._path = None if path is None else Path(path)
+        self._read_enabled = read_enabled
+        self._lock = threading.Lock()
+        if self._path is not None and self._path.exists():
+            with open(self._path, 'r') as registry_file:
+                # a database recorded without its teams, by a previous version, is scanned again
+                self._page_ids_per_database = {
+                    database_id: page_ids_per_team
+                    for database_id, page_ids_per_team in json.load(registry_file).items()
+                    if all(isinstance(page_ids, dict) for page_ids in page_ids_per_team.values())
+                }
+        else:
+            self._page_ids_per_database = {}
+
+    def get(self, database_id: str, team_key: str) -> Optional[Dict[str, str]]:
+        if not self._read_enabled:
+            return None
+        with self._lock:
+            page_ids = self._page_ids_per_database.get(database_id, {}).get(team_key)
+            return None if page_ids is None else dict(page_ids)
+
+    def replace(self, database_id: str, team_key: str, page_ids: Dict[str, str]) -> None:
+        with self._lock:
+            self._page_ids_per_database.setdefault(database_id, {})[team_key] = dict(page_ids)
+            self._save()
+
+    def add(self, database_id: str, team_key: str, cycle_name: str, page_id: str) -> None:
+        with self._lock:
+            self._page_ids_per_database.setdefault(database_id, {}).setdefault(team_key, {})[cycle_name] = page_id
+            self._save()
+
+    def _save(self) -> None:
+        if self._path is None:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._path, 'w') as registry_file:
+            json.dump(self._page_ids_per_database, registry_file, indent=2, sort_keys=True)
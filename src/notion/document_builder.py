@@ -1,6 +1,8 @@
 from abc import abstractmethod
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
+
+from src.linear.records import Ticket
 
 SIMPLIFIED_COLOR_PER_STATUS = {
     'To Do': {
@@ -74,9 +76,9 @@ class DocumentBuilder:
         self._title = title
         self._generation_method = generation_method
 
-    def build(self) -> Dict:
+    def build(self, lazy: bool = False) -> Dict:
         return (self._parent_block() | self._icon_block() | self._cover_block() | self._properties_block() |
-                self._children_block())
+                self._children_block(lazy=lazy))
 
     def _parent_block(self):
         return {
@@ -105,27 +107,30 @@ class DocumentBuilder:
     def _properties_block(self) -> Dict:
         pass
 
+    def _children_block(self, lazy: bool) -> Dict:
+        children = self._iter_children()
+        return {
+            'children': children if lazy else list(children)
+        }
+
     @abstractmethod
-    def _children_block(self) -> Dict:
+    def _iter_children(self) -> Iterator[Dict]:
         pass
 
-    def _ticket_details_blocks(self, title, ticket_list: List):
-        children = [
-            self._h1_block(title),
-            self._blank_line()
-        ]
+    def _ticket_details_blocks(self, title, ticket_list: List[Ticket]) -> Iterator[Dict]:
+        yield self._h1_block(title)
+        yield self._blank_line()
         for ticket in ticket_list:
-            children.append(self._h2_with_link_block(ticket["identifier"], ticket["url"], " - " + ticket["title"]))
-            children.append(self._paragraph_with_bold_key_block("Status. ", ticket['state']['name']))
-            if 'createdAt' in ticket.keys() and ticket['createdAt'] is not None:
-                children.append(self._paragraph_with_bold_key_block("Creation Date. ", ticket['createdAt']))
-            if 'startedAt' in ticket.keys() and ticket['startedAt'] is not None:
-                children.append(self._paragraph_with_bold_key_block("Start Date. ", ticket['startedAt']))
-            if 'completedAt' in ticket.keys() and ticket['completedAt'] is not None:
-                children.append(self._paragraph_with_bold_key_block("Resolution Date. ", ticket['completedAt']))
-            children.append(self._blank_line())
-
-        return children
+            yield self._h2_with_link_block(ticket.identifier, ticket.url, " - " + ticket.title)
+            yield self._paragraph_with_bold_key_block("Status. ", ticket.state)
+            if ticket.created_at is not None:
+                yield self._paragraph_with_bold_key_block("Creation Date. ", self._format_date(ticket.created_at))
+            if ticket.started_at is not None:
+                yield self._paragraph_with_bold_key_block("Start Date. ", self._format_date(ticket.started_at))
+            if ticket.completed_at is not None:
+                yield self._paragraph_with_bold_key_block("Resolution Date. ",
+                                                          self._format_date(ticket.completed_at))
+            yield self._blank_line()
 
     def _status_blocks(self, tickets_per_status: Dict, nb_tickets: int) -> List:
 
@@ -136,11 +141,11 @@ class DocumentBuilder:
         pie_colors = []
         pie_title = "tickets per status (exhaustive)"
         pie_data = {}
-        for stat in sorted(tickets_per_status.keys(), key=lambda _stat: len(tickets_per_status[_stat])):
+        for stat in sorted(tickets_per_status.keys(), key=lambda _stat: tickets_per_status[_stat].count):
             pie_colors.append(COLOR_PER_STATUS[stat]['hex'])
-            pie_data[stat] = len(tickets_per_status[stat])
+            pie_data[stat] = tickets_per_status[stat].count
             children.append(
-                self._colored_bullet_block(stat, len(tickets_per_status[stat]), COLOR_PER_STATUS[stat]['name']))
+                self._colored_bullet_block(stat, tickets_per_status[stat].count, COLOR_PER_STATUS[stat]['name']))
         children.append(self._blank_line())
         children.append(self._h2_block("Exhaustive chart"))
         children.append(self._pie_chart_block(pie_colors, pie_title, pie_data))
@@ -168,6 +173,14 @@ class DocumentBuilder:
 
         return children
 
+    @staticmethod
+    def _format_date(value: datetime) -> str:
+        return value.isoformat(sep='T', timespec='milliseconds').replace('+00:00', 'Z')
+
+    @staticmethod
+    def _format_number(value: float) -> str:
+        return f"{value:g}"
+
     @staticmethod
     def _title_block(value: str) -> Dict:
         return {
@@ -460,15 +473,19 @@ class DocumentBuilder:
         }
 
     @staticmethod
-    def _xychart_block(title, history_values):
-        x_axis_labels = ','.join(f"d{i}" for i in range(len(history_values)))
-        y_axis_labels = f"\"nb_tickets\" 0 --> {max(history_values)}"
+    def _xychart_block(title, history_values, x_axis_labels: Optional[List[str]] = None,
+                       y_axis_label: str = "nb_tickets"):
+        if x_axis_labels is None:
+            x_axis_labels = [f"d{i}" for i in range(len(history_values))]
+        x_axis_labels = ','.join(f'"{label}"' if not label.isalnum() else label for label in x_axis_labels)
+        y_axis_labels = f"\"{y_axis_label}\" 0 --> {DocumentBuilder._format_number(max(history_values))}"
+        bar_values = ", ".join(DocumentBuilder._format_number(value) for value in history_values)
         text = f"""
         xychart-beta
     title "{title}"
     x-axis [{x_axis_labels}]
     y-axis {y_axis_labels}
-    bar {history_values}
+    bar [{bar_values}]
         """
 
         return {
@@ -486,8 +503,15 @@ class DocumentBuilder:
             }
         }
 
+    @staticmethod
+    def _week_over_week_text(subject: str, week_labels: List[str], values: List[float], unit: str) -> str:
+        current, delta = values[-1], values[-1] - values[-2]
+        return (f"The {subject} is {DocumentBuilder._format_number(round(current, 1))}{unit}, "
+                f"{'+' if delta >= 0 else '-'}{DocumentBuilder._format_number(round(abs(delta), 1))}{unit} "
+                f"compared to {week_labels[-2]}.")
+
     @staticmethod
     def nb_values_for_key(dct: Dict, key: str) -> 0:
         if key in dct:
-            return len(dct[key])
+            return dct[key].count
         return 0
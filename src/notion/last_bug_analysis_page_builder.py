@@ -1,15 +1,19 @@
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Iterator, Optional
 
+from src.analysis_service.snapshot_store import Snapshot
+from src.linear.records import Ticket
 from src.notion.document_builder import DocumentBuilder
 
 COVER_URL = "https://images.unsplash.com/photo-1593510987185-1ec2256148a3"
 ICON = "🔎"
+CLOSED_STATUSES = frozenset(["Completed", "Ready to Go-Live", "Canceled"])
 
 
 class LastBugAnalysisPageBuilder(DocumentBuilder):
     def __init__(self, database_id: str, team_key: str, inspection_date: datetime, nb_tickets: int,
-                 tickets_per_status: Dict, timedelta: Dict, last_10_tickets: list):
+                 tickets_per_status: Dict, timedelta: Dict, last_10_tickets: list[Ticket],
+                 weekly_snapshots: Optional[list[Snapshot]] = None):
         super().__init__(icon=ICON, cover_url=COVER_URL, database_id=database_id, team_key=team_key,
                          inspection_date=inspection_date,
                          title=team_key + " - " + inspection_date.isoformat(sep='T', timespec='auto'),
@@ -19,6 +23,7 @@ class LastBugAnalysisPageBuilder(DocumentBuilder):
         self._tickets_per_status = tickets_per_status
         self._timedelta = timedelta
         self._last_10_tickets = last_10_tickets
+        self._weekly_snapshots = weekly_snapshots or []
 
     def _properties_block(self) -> Dict:
         return {
@@ -30,19 +35,16 @@ class LastBugAnalysisPageBuilder(DocumentBuilder):
             }
         }
 
-    def _children_block(self) -> Dict:
-        children = []
-
-        children.extend(self._status_blocks(tickets_per_status=self._tickets_per_status, nb_tickets=self._nb_tickets))
-        children.append(self._divider_block())
-        children.extend(self._resolution_time_blocks())
-        children.append(self._divider_block())
-        children.extend(
-            self._ticket_details_blocks(f"Last {len(self._last_10_tickets)} bugs synthesis", self._last_10_tickets))
-
-        return {
-            "children": children
-        }
+    def _iter_children(self) -> Iterator[Dict]:
+        yield from self._status_blocks(tickets_per_status=self._tickets_per_status, nb_tickets=self._nb_tickets)
+        yield self._divider_block()
+        yield from self._resolution_time_blocks()
+        yield self._divider_block()
+        if len(self._weekly_snapshots) > 1:
+            yield from self._trend_blocks()
+            yield self._divider_block()
+        yield from self._ticket_details_blocks(f"Last {len(self._last_10_tickets)} bugs synthesis",
+                                               self._last_10_tickets)
 
     def _resolution_time_blocks(self) -> list:
         timedelta = self._timedelta
@@ -53,24 +55,24 @@ class LastBugAnalysisPageBuilder(DocumentBuilder):
         ]
 
         cr_st_value = int(timedelta['delta_created_started']['value_hours'])
-        cr_st_size = int(timedelta['delta_created_started']['sample_size'])
         children.append(self._bullet_block(
             f"The average time between a ticket creation and the beginning of the work is {cr_st_value}hours."))
-        children.append(self._gray_italic_paragraph_block(f"(computation made on {cr_st_size} tickets)"))
+        children.append(
+            self._gray_italic_paragraph_block(self._distribution_text(timedelta['delta_created_started'])))
         children.append(self._blank_line())
 
         st_cp_value = int(timedelta['delta_started_completed']['value_hours'])
-        st_cp_size = int(timedelta['delta_started_completed']['sample_size'])
         children.append(
             self._bullet_block(f"The average time between a ticket start and its resolution is {st_cp_value}hours."))
-        children.append(self._gray_italic_paragraph_block(f"(computation made on {st_cp_size} tickets)"))
+        children.append(
+            self._gray_italic_paragraph_block(self._distribution_text(timedelta['delta_started_completed'])))
         children.append(self._blank_line())
 
         cr_cp_value = int(timedelta['delta_created_completed']['value_hours'])
-        cr_cp_size = int(timedelta['delta_created_completed']['sample_size'])
         children.append(
             self._bullet_block(f"The average time between a ticket creation and its resolution is {cr_cp_value}hours."))
-        children.append(self._gray_italic_paragraph_block(f"(computation made on {cr_cp_size} tickets)"))
+        children.append(
+            self._gray_italic_paragraph_block(self._distribution_text(timedelta['delta_created_completed'])))
         children.append(self._blank_line())
 
         children.append(self._h2_block("Chart"))
@@ -98,3 +100,30 @@ class LastBugAnalysisPageBuilder(DocumentBuilder):
         ]
         children.append(self._gantt_diagram_block(title, "%H", gantt_items))
         return children
+
+    def _trend_blocks(self) -> Iterator[Dict]:
+        week_labels = [snapshot.week_label for snapshot in self._weekly_snapshots]
+        median_resolution_hours = [(snapshot.aggregates['timedelta']['delta_created_completed'] or {}).get(
+            'median_hours', 0.0) for snapshot in self._weekly_snapshots]
+        nb_open_bugs = [snapshot.aggregates['nb_tickets'] - sum(
+            count for status, count in snapshot.aggregates['tickets_per_status'].items() if status in CLOSED_STATUSES)
+            for snapshot in self._weekly_snapshots]
+
+        yield self._h1_block(f"Trend over the last {len(week_labels)} weeks")
+        yield self._bullet_block(self._week_over_week_text("median time between a ticket creation and its resolution",
+                                                           week_labels, median_resolution_hours, unit="hours"))
+        yield self._bullet_block(self._week_over_week_text("number of open bugs among the last ones analyzed",
+                                                           week_labels, nb_open_bugs, unit=""))
+        yield self._blank_line()
+        yield self._h2_block("Median resolution time")
+        yield self._xychart_block("median time between creation and resolution (in hours)", median_resolution_hours,
+                                  x_axis_labels=week_labels, y_axis_label="hours")
+        yield self._h2_block("Open bugs")
+        yield self._xychart_block("open bugs", nb_open_bugs, x_axis_labels=week_labels)
+        yield self._blank_line()
+
+    @staticmethod
+    def _distribution_text(timedelta: Dict) -> str:
+        return (f"(median {int(timedelta['median_hours'])}hours, p75 {int(timedelta['p75_hours'])}hours, "
+                f"p90 {int(timedelta['p90_hours'])}hours, p99 {int(timedelta['p99_hours'])}hours; "
+                f"computation made on {int(timedelta['sample_size'])} tickets)")
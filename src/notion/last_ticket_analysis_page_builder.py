@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
+from src.analysis_service.snapshot_store import Snapshot
 from src.notion.document_builder import DocumentBuilder
 
 COVER_URL = "https://images.unsplash.com/photo-1593510987185-1ec2256148a3"
@@ -38,7 +39,8 @@ COLOR_PER_TYPE = {
 
 class LastTicketAnalysisPageBuilder(DocumentBuilder):
     def __init__(self, database_id: str, team_key: str, inspection_date: datetime, nb_tickets: int,
-                 tickets_per_description: Dict, tickets_per_status: Dict, tickets_per_type: Dict):
+                 tickets_per_description: Dict, tickets_per_status: Dict, tickets_per_type: Dict,
+                 weekly_snapshots: Optional[List[Snapshot]] = None):
         super().__init__(icon=ICON, cover_url=COVER_URL, database_id=database_id, team_key=team_key,
                          inspection_date=inspection_date,
                          title=team_key + " - " + inspection_date.isoformat(sep='T', timespec='auto'),
@@ -48,6 +50,7 @@ class LastTicketAnalysisPageBuilder(DocumentBuilder):
         self._tickets_per_description = tickets_per_description
         self._tickets_per_status = tickets_per_status
         self._tickets_per_type = tickets_per_type
+        self._weekly_snapshots = weekly_snapshots or []
 
     def _properties_block(self) -> Dict:
         return {
@@ -59,17 +62,15 @@ class LastTicketAnalysisPageBuilder(DocumentBuilder):
             }
         }
 
-    def _children_block(self) -> Dict:
-        children = []
-        children.extend(self._description_blocks())
-        children.append(self._divider_block())
-        children.extend(self._status_blocks(tickets_per_status=self._tickets_per_status, nb_tickets=self._nb_tickets))
-        children.append(self._divider_block())
-        children.extend(self._type_blocks(tickets_per_type=self._tickets_per_type, nb_tickets=self._nb_tickets))
-
-        return {
-            'children': children
-        }
+    def _iter_children(self) -> Iterator[Dict]:
+        yield from self._description_blocks()
+        yield self._divider_block()
+        yield from self._status_blocks(tickets_per_status=self._tickets_per_status, nb_tickets=self._nb_tickets)
+        yield self._divider_block()
+        yield from self._type_blocks(tickets_per_type=self._tickets_per_type, nb_tickets=self._nb_tickets)
+        if len(self._weekly_snapshots) > 1:
+            yield self._divider_block()
+            yield from self._trend_blocks()
 
     def _description_blocks(self) -> List:
         tickets_per_desc = self._tickets_per_description
@@ -77,9 +78,9 @@ class LastTicketAnalysisPageBuilder(DocumentBuilder):
         pie_colors = []
         pie_title = "Tickets with a description"
         pie_data = {}
-        for desc in sorted(tickets_per_desc.keys(), key=lambda _desc: len(tickets_per_desc[_desc])):
+        for desc in sorted(tickets_per_desc.keys(), key=lambda _desc: tickets_per_desc[_desc].count):
             pie_colors.append(COLOR_PER_DESCRIPTION[desc]['hex'])
-            pie_data[desc] = len(tickets_per_desc[desc])
+            pie_data[desc] = tickets_per_desc[desc].count
 
         children = [
             self._h1_block("Ticket description"),
@@ -90,8 +91,9 @@ class LastTicketAnalysisPageBuilder(DocumentBuilder):
             self._blank_line(),
             self._h2_block("List of tickets without description"),
         ]
-        for ticket in tickets_per_desc['No Description']:
-            children.append(self._bullet_with_link_block(ticket['identifier'], ticket['url']))
+        if 'No Description' in tickets_per_desc:
+            for identifier, url in tickets_per_desc['No Description'].references:
+                children.append(self._bullet_with_link_block(identifier, url))
         children.append(self._blank_line())
         return children
 
@@ -103,12 +105,36 @@ class LastTicketAnalysisPageBuilder(DocumentBuilder):
         pie_colors = []
         pie_title = "Tickets per type"
         pie_data = {}
-        for t_type in sorted(tickets_per_type.keys(), key=lambda _type: len(tickets_per_type[_type])):
-            children.append(self._colored_bullet_block(t_type, len(tickets_per_type[t_type]),
+        for t_type in sorted(tickets_per_type.keys(), key=lambda _type: tickets_per_type[_type].count):
+            children.append(self._colored_bullet_block(t_type, tickets_per_type[t_type].count,
                                                        COLOR_PER_TYPE[t_type]['name']))
             pie_colors.append(COLOR_PER_TYPE[t_type]['hex'])
-            pie_data[t_type] = len(tickets_per_type[t_type])
+            pie_data[t_type] = tickets_per_type[t_type].count
         children.append(self._blank_line())
         children.append(self._h2_block("Chart"))
         children.append(self._pie_chart_block(pie_colors, pie_title, pie_data))
         return children
+
+    def _trend_blocks(self) -> Iterator[Dict]:
+        week_labels = [snapshot.week_label for snapshot in self._weekly_snapshots]
+        description_shares = [self._share(snapshot.aggregates, 'tickets_per_description', 'Description')
+                              for snapshot in self._weekly_snapshots]
+        bug_shares = [self._share(snapshot.aggregates, 'tickets_per_type', 'Bug')
+                      for snapshot in self._weekly_snapshots]
+
+        yield self._h1_block(f"Trend over the last {len(week_labels)} weeks")
+        yield self._bullet_block(self._week_over_week_text("share of tickets with a description", week_labels,
+                                                           description_shares, unit="%"))
+        yield self._bullet_block(self._week_over_week_text("share of bugs", week_labels, bug_shares, unit="%"))
+        yield self._blank_line()
+        yield self._h2_block("Tickets with a description")
+        yield self._xychart_block("tickets with a description (%)", description_shares, x_axis_labels=week_labels,
+                                  y_axis_label="%")
+        yield self._h2_block("Bugs")
+        yield self._xychart_block("bugs among the tickets (%)", bug_shares, x_axis_labels=week_labels,
+                                  y_axis_label="%")
+
+    @staticmethod
+    def _share(aggregates: Dict, dimension: str, key: str) -> float:
+        nb_tickets = aggregates['nb_tickets']
+        return 100 * aggregates[dimension].get(key, 0) / nb_tickets if nb_tickets > 0 else 0.0
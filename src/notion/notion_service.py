@@ -1,32 +1,98 @@
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from itertools import islice
+from typing import Dict, Iterable, Optional
 
+from src.defaults import NOTION_URL
 from src.http_client import HttpClient
+from src.notion.cycle_registry import CycleRegistry
+
+NOTION_MAX_PAGE_SIZE = 100
+NOTION_MAX_BLOCKS_PER_REQUEST = 100
 
 
 class NotionService:
-    def __init__(self, api_key: str):
-        headers = {
+    def __init__(self, api_key: str, http_client: HttpClient, cycle_registry: Optional[CycleRegistry] = None,
+                 url: str = NOTION_URL):
+        self._headers = {
             'Content-Type': 'application/json',
             'Notion-Version': '2022-06-28',
             'Authorization': f'Bearer {api_key}'
         }
-        self._http_client = HttpClient(headers=headers)
+        self._http_client = http_client
+        self._url = url
+        self._cycle_registry = cycle_registry
+
+    def insert_notion_page(self, payload: Dict) -> Dict:
+        url = f"{self._url}/pages"
+        children = iter(payload.get('children', []))
+        first_children = list(islice(children, NOTION_MAX_BLOCKS_PER_REQUEST))
+
+        # a creation retried after a lost response would create the page twice
+        page = self._http_client.post(url=url, payload=payload | {'children': first_children}, headers=self._headers,
+                                      idempotent=False)
+        self.append_blocks(block_id=page['id'], blocks=children)
+        return page
 
-    def insert_notion_page(self, payload: Dict) -> None:
-        url = "https://api.notion.com/v1/pages"
-        self._http_client.post(url=url, payload=payload)
+    def append_blocks(self, block_id: str, blocks: Iterable[Dict]) -> None:
+        url = f"{self._url}/blocks/{block_id}/children"
+        blocks = iter(blocks)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending_append = None
+            while chunk := list(islice(blocks, NOTION_MAX_BLOCKS_PER_REQUEST)):
+                if pending_append is not None:
+                    pending_append.result()
+                # an append retried after a lost response would add its blocks twice
+                pending_append = executor.submit(copy_context().run, self._http_client.patch, url=url,
+                                                 payload={'children': chunk}, headers=self._headers,
+                                                 idempotent=False)
+            if pending_append is not None:
+                pending_append.result()
 
-    def is_cycle_doc_exists(self, database_id, cycle_name) -> bool:
-        url = f"https://api.notion.com/v1/databases/{database_id}/query"
+    def get_documented_cycles(self, database_id: str, team_key: str) -> Dict[str, str]:
+        """Notion page of each cycle of the team documented in the database, whose title starts with the team key."""
+        if self._cycle_registry is not None:
+            page_ids_per_cycle = self._cycle_registry.get(database_id=database_id, team_key=team_key)
+            if page_ids_per_cycle is not None:
+                return page_ids_per_cycle
 
+        url = f"{self._url}/databases/{database_id}/query"
         payload = {
             "filter": {
-                "property": "Cycle",
-                "rich_text": {
-                    "equals": cycle_name
-                }
-            }
+                "and": [
+                    {
+                        "property": "Cycle",
+                        "rich_text": {
+                            "is_not_empty": True
+                        }
+                    },
+                    {
+                        "property": "Name",
+                        "title": {
+                            "starts_with": f"{team_key} - "
+                        }
+                    }
+                ]
+            },
+            "page_size": NOTION_MAX_PAGE_SIZE
         }
 
-        response = self._http_client.post(url=url, payload=payload, response_json_path=['results'])
-        return len(response) > 0
+        page_ids_per_cycle = {}
+        while True:
+            response = self._http_client.post(url=url, payload=payload, headers=self._headers)
+            for page in response['results']:
+                cycle_name = "".join(text['plain_text'] for text in page['properties']['Cycle']['rich_text'])
+                page_ids_per_cycle[cycle_name] = page['id']
+
+            if not response['has_more']:
+                break
+            payload['start_cursor'] = response['next_cursor']
+
+        if self._cycle_registry is not None:
+            self._cycle_registry.replace(database_id=database_id, team_key=team_key, page_ids=page_ids_per_cycle)
+        return page_ids_per_cycle
+
+    def register_cycle_doc(self, database_id: str, team_key: str, cycle_name: str, page_id: str) -> None:
+        if self._cycle_registry is not None:
+            self._cycle_registry.add(database_id=database_id, team_key=team_key, cycle_name=cycle_name,
+                                     page_id=page_id)
@@ -0,0 +1,174 @@
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+from src.defaults import DEFAULT_PROFILE_DIR
+
+DEFAULT_SAMPLING_INTERVAL_MS = 10.0
+NB_TOP_ALLOCATION_SITES = 25
+
+# the label of the analysis being profiled, propagated to its worker threads along with its context
+_profiled_label: ContextVar[Optional[str]] = ContextVar('profiled_label', default=None)
+
+
+class Profiler:
+    """Profiles the analyses, one output file set per label, either deterministically or by sampling their stacks.
+
+    The deterministic mode runs cProfile and tracemalloc, which only give meaningful results when the analyses run one
+    after the other. The sampling mode only reads the stacks of the profiled threads at a fixed interval.
+
+    Besides the thread running the analysis, the threads it starts are profiled from the first task they run in its
+    context (the services submit their tasks with `copy_context().run`), and their results are merged into its files.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_PROFILE_DIR, sampling: bool = False,
+                 sampling_interval_ms: float = DEFAULT_SAMPLING_INTERVAL_MS):
+        self._output_dir = Path(output_dir)
+        self._sampling = sampling
+        self._sampling_interval_seconds = sampling_interval_ms / 1000
+        self._lock = threading.Lock()
+        self._on_thread_start_per_label: Dict[str, Callable[[], None]] = {}
+
+    @property
+    def sampling(self) -> bool:
+        return self._sampling
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[None]:
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        profile = self._profile_with_sampling if self._sampling else self._profile_deterministically
+        label = label.replace(os.sep, '_').replace(' ', '_')
+        token = _profiled_label.set(label)
+        try:
+            with profile(label=label):
+                yield
+        finally:
+            _profiled_label.reset(token)
+
+    @contextmanager
+    def _profile_deterministically(self, label: str) -> Iterator[None]:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        snapshot_before = tracemalloc.take_snapshot()
+        thread_profiles = []
+
+        def profile_thread() -> None:
+            thread_profile = cProfile.Profile()
+            thread_profiles.append(thread_profile)
+            thread_profile.enable()
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            with self._on_thread_start(label=label, callback=profile_thread):
+                yield
+        finally:
+            profile.disable()
+            snapshot_after = tracemalloc.take_snapshot()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            stats = pstats.Stats(profile)
+            for thread_profile in thread_profiles:
+                stats.add(thread_profile)
+            stats.dump_stats(self._output_dir / f"{label}.pstats")
+            self._dump_allocation_sites(label=label, peak_bytes=peak_bytes,
+                                        statistics=snapshot_after.compare_to(snapshot_before, 'lineno'))
+
+    @contextmanager
+    def _profile_with_sampling(self, label: str) -> Iterator[None]:
+        sampler = StackSampler(thread_id=threading.get_ident(), interval_seconds=self._sampling_interval_seconds)
+        sampler.start()
+        try:
+            with self._on_thread_start(label=label, callback=lambda: sampler.add_thread(threading.get_ident())):
+                yield
+        finally:
+            sampler.stop()
+            self._dump_stacks(label=label, stacks=sampler.stacks, nb_samples=sampler.nb_samples)
+
+    @contextmanager
+    def _on_thread_start(self, label: str, callback: Callable[[], None]) -> Iterator[None]:
+        """Runs `callback` in every thread started from now on, once it runs a task of the analysis `label`."""
+        with self._lock:
+            self._on_thread_start_per_label[label] = callback
+            threading.setprofile(self._thread_start_hook)
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._on_thread_start_per_label[label]
+                if not self._on_thread_start_per_label:
+                    threading.setprofile(None)
+
+    def _thread_start_hook(self, frame, event: str, arg) -> None:
+        # called on every function call of a new thread until it runs a task in the context of a profiled analysis
+        label = _profiled_label.get()
+        if label is None:
+            return
+        sys.setprofile(None)
+        with self._lock:
+            callback = self._on_thread_start_per_label.get(label)
+        if callback is not None:
+            callback()
+
+    def _dump_allocation_sites(self, label: str, peak_bytes: int, statistics: list[tracemalloc.StatisticDiff]) -> None:
+        path = self._output_dir / f"{label}.allocations.txt"
+        with open(path, 'w') as file:
+            file.write(f"Peak traced memory: {peak_bytes / 1024:.1f} KiB\n")
+            file.write(f"Top {NB_TOP_ALLOCATION_SITES} allocation sites, by memory still allocated at the end:\n")
+            for statistic in statistics[:NB_TOP_ALLOCATION_SITES]:
+                file.write(f"{statistic}\n")
+        logging.info(f"{label}: profile written in {self._output_dir}")
+
+    def _dump_stacks(self, label: str, stacks: Counter, nb_samples: int) -> None:
+        path = self._output_dir / f"{label}.stacks.txt"
+        with open(path, 'w') as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+        logging.info(f"{label}: {nb_samples} stack samples written in {path}")
+
+
+class StackSampler(threading.Thread):
+    """Counts the stacks of a thread and of the threads added to it, in the collapsed format of the flame graph tools
+    (root first)."""
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        super().__init__(name=f"stack-sampler-{thread_id}", daemon=True)
+        self._thread_ids = {thread_id}
+        self._interval_seconds = interval_seconds
+        self._stopped = threading.Event()
+        self.stacks = Counter()
+        self.nb_samples = 0
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval_seconds):
+            frames = sys._current_frames()
+            for thread_id in list(self._thread_ids):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[tuple(reversed(stack))] += 1
+                    self.nb_samples += 1
+
+    def add_thread(self, thread_id: int) -> None:
+        self._thread_ids.add(thread_id)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
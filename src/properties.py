@@ -1,8 +1,30 @@
 import argparse
-from typing import Optional
+import logging
+from typing import Dict, Optional
 
 from jproperties import Properties as JProperties
 
+from src.analysis_service.registry import ANALYSIS_SERVICES
+from src.defaults import (DEFAULT_CACHE_MAX_SIZE_MB, DEFAULT_CACHE_PATH, DEFAULT_CONNECT_TIMEOUT,
+                          DEFAULT_ISSUE_STORE_PATH, DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE,
+                          DEFAULT_PROFILE_DIR, DEFAULT_READ_TIMEOUT, DEFAULT_SNAPSHOT_STORE_PATH, LINEAR_URL,
+                          NOTION_URL)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_INTERVALS_SECONDS = {"TICKET": 86400.0, "BUG": 86400.0, "CYCLE": 3600.0}
+DURATION_UNITS_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+DEFAULT_LINEAR_OLDER_BUG_REQUEST_TEMPLATE = "linear_older_bug_request.graphql"
+DEFAULT_LINEAR_CYCLE_INDEX_REQUEST_TEMPLATE = "linear_cycle_index_request.graphql"
+DEFAULT_LINEAR_CYCLE_ISSUES_REQUEST_TEMPLATE = "linear_cycle_issues_request.graphql"
+# the Jinja templates replaced by the GraphQL documents, still named by older configuration files
+LEGACY_REQUEST_TEMPLATES = {
+    "linear_ticket_request_template.jinja": "linear_ticket_request.graphql",
+    "linear_bug_request_template.jinja": "linear_bug_request.graphql",
+    "linear_cycle_request_template.jinja": "linear_cycle_request.graphql",
+    "linear_issue_sync_request_template.jinja": "linear_issue_sync_request.graphql"
+}
+
+
 class Properties:
     def __init__(self):
         argument_parser = self.InnerArgumentParser()
@@ -11,32 +33,95 @@ class Properties:
 
         self._linear_api_key = self._validate_str(value=properties.get("linear_api_key").data)
         self._notion_api_key = self._validate_str(value=properties.get("notion_api_key").data)
-        self._team_key = self._validate_str(value=properties.get("team_key").data)
+        team_keys = self._validate_str(value=properties.get("team_key").data).split(',')
+        self._team_keys = self._validate_list_str(value=[team_key.strip() for team_key in team_keys])
         self._mode = self._validate_list_str(value=argument_parser.mode)
+        linear_url = properties.get("linear_url")
+        self._linear_url = LINEAR_URL if linear_url is None else self._validate_str(value=linear_url.data)
+        notion_url = properties.get("notion_url")
+        self._notion_url = NOTION_URL if notion_url is None else self._validate_str(value=notion_url.data)
         if 'TICKET' in self._mode:
             self._ticket_analysis_db_id = self._validate_str(properties.get("ticket_analysis_db_id").data)
-            self._linear_ticket_request_template = self._validate_str(
-                properties.get("linear_ticket_request_template").data)
+            self._linear_ticket_request_template = self._validate_request_template(
+                value=properties.get("linear_ticket_request_template").data)
         else:
             self._ticket_analysis_db_id = None
             self._linear_ticket_request_template = None
         if 'BUG' in self._mode:
             self._bug_analysis_db_id = self._validate_str(properties.get("bug_analysis_db_id").data)
-            self._linear_bug_request_template = self._validate_str(properties.get("linear_bug_request_template").data)
+            self._linear_bug_request_template = self._validate_request_template(
+                value=properties.get("linear_bug_request_template").data)
+            older_bug_template = properties.get("linear_older_bug_request_template")
+            self._linear_older_bug_request_template = DEFAULT_LINEAR_OLDER_BUG_REQUEST_TEMPLATE \
+                if older_bug_template is None else self._validate_request_template(value=older_bug_template.data)
         else:
             self._bug_analysis_db_id = None
             self._linear_bug_request_template = None
+            self._linear_older_bug_request_template = None
         if 'CYCLE' in self._mode:
             self._cycle_analysis_db_id = self._validate_str(properties.get("cycle_analysis_db_id").data)
-            self._linear_cycle_request_template = self._validate_str(
-                properties.get("linear_cycle_request_template").data)
+            self._linear_cycle_request_template = self._validate_request_template(
+                value=properties.get("linear_cycle_request_template").data)
+            cycle_index_template = properties.get("linear_cycle_index_request_template")
+            self._linear_cycle_index_request_template = DEFAULT_LINEAR_CYCLE_INDEX_REQUEST_TEMPLATE \
+                if cycle_index_template is None else self._validate_request_template(value=cycle_index_template.data)
+            cycle_issues_template = properties.get("linear_cycle_issues_request_template")
+            self._linear_cycle_issues_request_template = DEFAULT_LINEAR_CYCLE_ISSUES_REQUEST_TEMPLATE \
+                if cycle_issues_template is None else self._validate_request_template(value=cycle_issues_template.data)
         else:
             self._cycle_analysis_db_id = None
             self._linear_cycle_request_template = None
+            self._linear_cycle_index_request_template = None
+            self._linear_cycle_issues_request_template = None
         if 'TICKET' in self._mode or 'BUG' in self._mode:
             self._max_nb_tickets_to_analyze = self._validate_int(value=argument_parser.max_nb_tickets_to_analyze)
         else:
             self._max_nb_tickets_to_analyze = None
+        if argument_parser.incremental_sync and ('TICKET' in self._mode or 'BUG' in self._mode):
+            self._issue_store_path = self._validate_str(value=argument_parser.issue_store_path)
+            self._linear_issue_sync_request_template = self._validate_request_template(
+                value=properties.get("linear_issue_sync_request_template").data)
+        else:
+            self._issue_store_path = None
+            self._linear_issue_sync_request_template = None
+        self._http_pool_size = self._validate_int(value=argument_parser.http_pool_size)
+        self._http_connect_timeout = self._validate_float(value=argument_parser.http_connect_timeout)
+        self._http_read_timeout = self._validate_float(value=argument_parser.http_read_timeout)
+        self._http_max_retries = self._validate_positive_or_zero_int(value=argument_parser.http_max_retries)
+        self._use_cache = not argument_parser.no_cache
+        self._refresh_cache = bool(argument_parser.refresh_cache)
+        self._cache_path = self._validate_str(value=argument_parser.cache_path)
+        self._cache_max_size_mb = self._validate_int(value=argument_parser.cache_max_size_mb)
+        if 'CYCLE' in self._mode and argument_parser.cycle_registry_path is not None:
+            self._cycle_registry_path = self._validate_str(value=argument_parser.cycle_registry_path)
+        else:
+            self._cycle_registry_path = None
+        self._batch_linear_queries = bool(argument_parser.batch_linear_queries)
+        self._max_workers = self._validate_int(value=argument_parser.max_workers)
+        self._use_async = bool(argument_parser.use_async)
+        self._max_concurrency = self._validate_int(value=argument_parser.max_concurrency)
+        if argument_parser.metrics_json_path is not None:
+            self._metrics_json_path = self._validate_str(value=argument_parser.metrics_json_path)
+        else:
+            self._metrics_json_path = None
+        if argument_parser.metrics_prometheus_path is not None:
+            self._metrics_prometheus_path = self._validate_str(value=argument_parser.metrics_prometheus_path)
+        else:
+            self._metrics_prometheus_path = None
+        self._profile = bool(argument_parser.profile or argument_parser.profile_sampling)
+        self._profile_sampling = bool(argument_parser.profile_sampling)
+        self._profile_dir = self._validate_str(value=argument_parser.profile_dir)
+        self._import_time_report = bool(argument_parser.import_time_report)
+        self._daemon = bool(argument_parser.daemon)
+        self._intervals_seconds = {
+            mode: self._validate_float(value=seconds)
+            for mode, seconds in (DEFAULT_INTERVALS_SECONDS | dict(argument_parser.intervals or [])).items()
+            if mode in self._mode
+        }
+        if not argument_parser.no_snapshots and ('TICKET' in self._mode or 'BUG' in self._mode):
+            self._snapshot_store_path = self._validate_str(value=argument_parser.snapshot_store_path)
+        else:
+            self._snapshot_store_path = None
 
     @property
     def linear_api_key(self) -> str:
@@ -47,8 +132,16 @@ class Properties:
         return self._notion_api_key
 
     @property
-    def team_key(self) -> str:
-        return self._team_key
+    def linear_url(self) -> str:
+        return self._linear_url
+
+    @property
+    def notion_url(self) -> str:
+        return self._notion_url
+
+    @property
+    def team_keys(self) -> list[str]:
+        return self._team_keys
 
     @property
     def mode(self) -> list[str]:
@@ -78,10 +171,118 @@ class Properties:
     def linear_bug_request_template(self) -> Optional[str]:
         return self._linear_bug_request_template
 
+    @property
+    def linear_older_bug_request_template(self) -> Optional[str]:
+        return self._linear_older_bug_request_template
+
     @property
     def linear_cycle_request_template(self) -> Optional[str]:
         return self._linear_cycle_request_template
 
+    @property
+    def linear_cycle_index_request_template(self) -> Optional[str]:
+        return self._linear_cycle_index_request_template
+
+    @property
+    def linear_cycle_issues_request_template(self) -> Optional[str]:
+        return self._linear_cycle_issues_request_template
+
+    @property
+    def linear_issue_sync_request_template(self) -> Optional[str]:
+        return self._linear_issue_sync_request_template
+
+    @property
+    def issue_store_path(self) -> Optional[str]:
+        return self._issue_store_path
+
+    @property
+    def http_pool_size(self) -> int:
+        return self._http_pool_size
+
+    @property
+    def http_connect_timeout(self) -> float:
+        return self._http_connect_timeout
+
+    @property
+    def http_read_timeout(self) -> float:
+        return self._http_read_timeout
+
+    @property
+    def http_max_retries(self) -> int:
+        return self._http_max_retries
+
+    @property
+    def use_cache(self) -> bool:
+        return self._use_cache
+
+    @property
+    def refresh_cache(self) -> bool:
+        return self._refresh_cache
+
+    @property
+    def cache_path(self) -> str:
+        return self._cache_path
+
+    @property
+    def cache_max_size_mb(self) -> int:
+        return self._cache_max_size_mb
+
+    @property
+    def cycle_registry_path(self) -> Optional[str]:
+        return self._cycle_registry_path
+
+    @property
+    def batch_linear_queries(self) -> bool:
+        return self._batch_linear_queries
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    @property
+    def use_async(self) -> bool:
+        return self._use_async
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    @property
+    def metrics_json_path(self) -> Optional[str]:
+        return self._metrics_json_path
+
+    @property
+    def metrics_prometheus_path(self) -> Optional[str]:
+        return self._metrics_prometheus_path
+
+    @property
+    def profile(self) -> bool:
+        return self._profile
+
+    @property
+    def profile_sampling(self) -> bool:
+        return self._profile_sampling
+
+    @property
+    def profile_dir(self) -> str:
+        return self._profile_dir
+
+    @property
+    def import_time_report(self) -> bool:
+        return self._import_time_report
+
+    @property
+    def daemon(self) -> bool:
+        return self._daemon
+
+    @property
+    def intervals_seconds(self) -> Dict[str, float]:
+        return self._intervals_seconds
+
+    @property
+    def snapshot_store_path(self) -> Optional[str]:
+        return self._snapshot_store_path
+
     @staticmethod
     def _load_file(properties_file_path: str) -> JProperties:
         props = JProperties()
@@ -90,6 +291,18 @@ class Properties:
 
         return props
 
+    @staticmethod
+    def _parse_interval(value: str) -> tuple[str, float]:
+        mode, _, duration = value.partition('=')
+        unit_seconds = DURATION_UNITS_SECONDS.get(duration[-1:])
+        try:
+            seconds = float(duration[:-1]) * unit_seconds if unit_seconds is not None else float(duration)
+        except ValueError:
+            seconds = None
+        if mode not in ANALYSIS_SERVICES or seconds is None:
+            raise argparse.ArgumentTypeError(f"invalid interval '{value}', expected MODE=DURATION, e.g. CYCLE=1h")
+        return mode, seconds
+
     @staticmethod
     def _validate_str(value: str) -> str:
         assert value is not None
@@ -97,6 +310,18 @@ class Properties:
         assert len(value) > 0
         return value
 
+    @staticmethod
+    def _validate_request_template(value: str) -> str:
+        value = Properties._validate_str(value=value)
+        if value in LEGACY_REQUEST_TEMPLATES:
+            logging.warning(f"the request template '{value}' is deprecated, '{LEGACY_REQUEST_TEMPLATES[value]}' is "
+                            f"used instead; please update the configuration file")
+            return LEGACY_REQUEST_TEMPLATES[value]
+        if value.endswith('.jinja'):
+            raise ValueError(f"the request template '{value}' is no longer supported, the Linear queries are "
+                             f"GraphQL documents (.graphql) located in the resources folder")
+        return value
+
     @staticmethod
     def _validate_list_str(value: list[str]) -> list[str]:
         value = list(value)
@@ -109,6 +334,18 @@ class Properties:
         assert value > 0
         return value
 
+    @staticmethod
+    def _validate_positive_or_zero_int(value: int) -> int:
+        value = int(value)
+        assert value >= 0
+        return value
+
+    @staticmethod
+    def _validate_float(value: float) -> float:
+        value = float(value)
+        assert value > 0
+        return value
+
     class InnerArgumentParser:
         def __init__(self):
             parser = argparse.ArgumentParser(description="Linear stats to Notion")
@@ -132,14 +369,223 @@ class Properties:
                 nargs='+',
                 type=str,
                 help='list of modes, among \'TICKET\', \'BUG\' AND \'CYCLE\'',
-                choices=['TICKET', 'BUG', 'CYCLE'],
+                choices=list(ANALYSIS_SERVICES),
                 required=True
             )
 
+            parser.add_argument(
+                '--incremental-sync',
+                dest='incremental_sync',
+                action='store_true',
+                help='only fetch the issues updated since the last run and analyze the local mirror of the issues'
+            )
+
+            parser.add_argument(
+                '--issue-store-path',
+                dest='issue_store_path',
+                type=str,
+                default=DEFAULT_ISSUE_STORE_PATH
+            )
+
+            parser.add_argument(
+                '--http-pool-size',
+                dest='http_pool_size',
+                type=int,
+                help='max number of kept-alive connections per host',
+                default=DEFAULT_POOL_SIZE
+            )
+
+            parser.add_argument(
+                '--http-connect-timeout',
+                dest='http_connect_timeout',
+                type=float,
+                help='timeout in seconds to establish a connection',
+                default=DEFAULT_CONNECT_TIMEOUT
+            )
+
+            parser.add_argument(
+                '--http-read-timeout',
+                dest='http_read_timeout',
+                type=float,
+                help='timeout in seconds to wait for data on an established connection',
+                default=DEFAULT_READ_TIMEOUT
+            )
+
+            parser.add_argument(
+                '--http-max-retries',
+                dest='http_max_retries',
+                type=int,
+                help='max number of retries of a request rejected by a rate limit or a transient server error',
+                default=DEFAULT_MAX_RETRIES
+            )
+
+            parser.add_argument(
+                '--no-cache',
+                dest='no_cache',
+                action='store_true',
+                help='neither read nor write the local cache of the Linear responses'
+            )
+
+            parser.add_argument(
+                '--refresh',
+                dest='refresh_cache',
+                action='store_true',
+                help='fetch fresh data from Linear and Notion and overwrite the local cache and cycle registry'
+            )
+
+            parser.add_argument(
+                '--cache-path',
+                dest='cache_path',
+                type=str,
+                default=DEFAULT_CACHE_PATH
+            )
+
+            parser.add_argument(
+                '--cache-max-size-mb',
+                dest='cache_max_size_mb',
+                type=int,
+                default=DEFAULT_CACHE_MAX_SIZE_MB
+            )
+
+            parser.add_argument(
+                '--cycle-registry-path',
+                dest='cycle_registry_path',
+                type=str,
+                help='local file recording the Notion page of each documented cycle, to skip the lookup on Notion'
+            )
+
+            parser.add_argument(
+                '--batch-linear-queries',
+                dest='batch_linear_queries',
+                action='store_true',
+                help='send the first query of every mode to Linear in a single request'
+            )
+
+            parser.add_argument(
+                '--max-workers',
+                dest='max_workers',
+                type=int,
+                help='max number of (team, mode) analyses running at the same time',
+                default=DEFAULT_MAX_WORKERS
+            )
+
+            parser.add_argument(
+                '--async',
+                dest='use_async',
+                action='store_true',
+                help='run the modes concurrently on the asyncio engine'
+            )
+
+            parser.add_argument(
+                '--max-concurrency',
+                dest='max_concurrency',
+                type=int,
+                help='max number of requests in flight at the same time with --async',
+                default=DEFAULT_MAX_CONCURRENCY
+            )
+
+            parser.add_argument(
+                '--metrics-json-path',
+                dest='metrics_json_path',
+                type=str,
+                help='file receiving the summary of the run metrics per team and mode, as JSON'
+            )
+
+            parser.add_argument(
+                '--metrics-prometheus-path',
+                dest='metrics_prometheus_path',
+                type=str,
+                help='file receiving the run metrics in the Prometheus text format'
+            )
+
+            parser.add_argument(
+                '--profile',
+                dest='profile',
+                action='store_true',
+                help='profile each analysis with cProfile and tracemalloc, one after the other'
+            )
+
+            parser.add_argument(
+                '--profile-sampling',
+                dest='profile_sampling',
+                action='store_true',
+                help='profile each analysis by sampling its stack, at a low overhead'
+            )
+
+            parser.add_argument(
+                '--profile-dir',
+                dest='profile_dir',
+                type=str,
+                default=DEFAULT_PROFILE_DIR
+            )
+
+            parser.add_argument(
+                '--import-time-report',
+                dest='import_time_report',
+                action='store_true',
+                help='print the import time of the modules loaded by the selected modes, then exit'
+            )
+
+            parser.add_argument(
+                '--daemon',
+                dest='daemon',
+                action='store_true',
+                help='keep running and analyze each mode at its own interval, until interrupted'
+            )
+
+            parser.add_argument(
+                '--interval',
+                dest='intervals',
+                nargs='+',
+                type=Properties._parse_interval,
+                metavar='MODE=DURATION',
+                help='time between two analyses of a mode with --daemon, in seconds or with a s, m, h or d suffix '
+                     '(default: TICKET=1d BUG=1d CYCLE=1h)'
+            )
+
+            parser.add_argument(
+                '--no-snapshots',
+                dest='no_snapshots',
+                action='store_true',
+                help='neither record the aggregates of the ticket and bug analyses nor show their weekly trend'
+            )
+
+            parser.add_argument(
+                '--snapshot-store-path',
+                dest='snapshot_store_path',
+                type=str,
+                default=DEFAULT_SNAPSHOT_STORE_PATH
+            )
+
             args = parser.parse_args()
             self._properties_file_path = args.properties_file_path
             self._mode = args.mode
             self._max_nb_tickets_to_analyze = args.max_nb_tickets_to_analyze
+            self._incremental_sync = args.incremental_sync
+            self._issue_store_path = args.issue_store_path
+            self._http_pool_size = args.http_pool_size
+            self._http_connect_timeout = args.http_connect_timeout
+            self._http_read_timeout = args.http_read_timeout
+            self._http_max_retries = args.http_max_retries
+            self._no_cache = args.no_cache
+            self._refresh_cache = args.refresh_cache
+            self._cache_path = args.cache_path
+            self._cache_max_size_mb = args.cache_max_size_mb
+            self._cycle_registry_path = args.cycle_registry_path
+            self._batch_linear_queries = args.batch_linear_queries
+            self._max_workers = args.max_workers
+            self._use_async = args.use_async
+            self._max_concurrency = args.max_concurrency
+            self._metrics_json_path = args.metrics_json_path
+            self._metrics_prometheus_path = args.metrics_prometheus_path
+            self._profile = args.profile
+            self._profile_sampling = args.profile_sampling
+            self._profile_dir = args.profile_dir
+            self._import_time_report = args.import_time_report
+            self._daemon = args.daemon
+            self._intervals = args.intervals
+            self._no_snapshots = args.no_snapshots
+            self._snapshot_store_path = args.snapshot_store_path
 
         @property
         def properties_file_path(self) -> str:
@@ -152,3 +598,103 @@ class Properties:
         @property
         def max_nb_tickets_to_analyze(self) -> int:
             return self._max_nb_tickets_to_analyze
+
+        @property
+        def incremental_sync(self) -> bool:
+            return self._incremental_sync
+
+        @property
+        def issue_store_path(self) -> str:
+            return self._issue_store_path
+
+        @property
+        def http_pool_size(self) -> int:
+            return self._http_pool_size
+
+        @property
+        def http_connect_timeout(self) -> float:
+            return self._http_connect_timeout
+
+        @property
+        def http_read_timeout(self) -> float:
+            return self._http_read_timeout
+
+        @property
+        def http_max_retries(self) -> int:
+            return self._http_max_retries
+
+        @property
+        def no_cache(self) -> bool:
+            return self._no_cache
+
+        @property
+        def refresh_cache(self) -> bool:
+            return self._refresh_cache
+
+        @property
+        def cache_path(self) -> str:
+            return self._cache_path
+
+        @property
+        def cache_max_size_mb(self) -> int:
+            return self._cache_max_size_mb
+
+        @property
+        def cycle_registry_path(self) -> Optional[str]:
+            return self._cycle_registry_path
+
+        @property
+        def batch_linear_queries(self) -> bool:
+            return self._batch_linear_queries
+
+        @property
+        def max_workers(self) -> int:
+            return self._max_workers
+
+        @property
+        def use_async(self) -> bool:
+            return self._use_async
+
+        @property
+        def max_concurrency(self) -> int:
+            return self._max_concurrency
+
+        @property
+        def metrics_json_path(self) -> Optional[str]:
+            return self._metrics_json_path
+
+        @property
+        def metrics_prometheus_path(self) -> Optional[str]:
+            return self._metrics_prometheus_path
+
+        @property
+        def profile(self) -> bool:
+            return self._profile
+
+        @property
+        def profile_sampling(self) -> bool:
+            return self._profile_sampling
+
+        @property
+        def profile_dir(self) -> str:
+            return self._profile_dir
+
+        @property
+        def import_time_report(self) -> bool:
+            return self._import_time_report
+
+        @property
+        def daemon(self) -> bool:
+            return self._daemon
+
+        @property
+        def intervals(self) -> Optional[list[tuple[str, float]]]:
+            return self._intervals
+
+        @property
+        def no_snapshots(self) -> bool:
+            return self._no_snapshots
+
+        @property
+        def snapshot_store_path(self) -> str:
+            return self._snapshot_store_path
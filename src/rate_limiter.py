@@ -0,0 +1,56 @@
+import threading
+import time
+from typing import Dict
+
+NOTION_HOST = "api.notion.com"
+LINEAR_HOST = "api.linear.app"
+
+DEFAULT_REQUEST_BUDGETS = {
+    NOTION_HOST: (3.0, 3),
+    LINEAR_HOST: (1500 / 3600, 1500)
+}
+
+
+class TokenBucket:
+    def __init__(self, requests_per_second: float, burst: int):
+        self._rate = requests_per_second
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+                self._last_refill = now
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class RateLimiter:
+    def __init__(self, request_budgets: Dict[str, tuple[float, int]] = None):
+        request_budgets = DEFAULT_REQUEST_BUDGETS if request_budgets is None else request_budgets
+        self._buckets = {host: TokenBucket(requests_per_second=rate, burst=burst)
+                         for host, (rate, burst) in request_budgets.items()}
+
+    def acquire(self, host: str) -> None:
+        if host in self._buckets:
+            self._buckets[host].acquire()
+
+    def pause(self, host: str, seconds: float) -> None:
+        if host in self._buckets:
+            self._buckets[host].pause(seconds=seconds)
@@ -0,0 +1,68 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class ScheduledJob:
+    __slots__ = ('name', 'interval_seconds', 'func', 'next_run', 'future')
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], None], next_run: float):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.next_run = next_run
+        self.future: Optional[Future] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+
+class Scheduler:
+    """Runs each job every `interval_seconds`, the first time as soon as the scheduler starts.
+
+    The jobs run concurrently, but two executions of the same job never overlap: an execution due while the previous one
+    is still running is skipped. Once stopped, the scheduler waits for the running executions before returning.
+    """
+
+    def __init__(self):
+        self._jobs: list[ScheduledJob] = []
+        self._stopped = threading.Event()
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable[[], None]) -> None:
+        self._jobs.append(ScheduledJob(name=name, interval_seconds=interval_seconds, func=func,
+                                       next_run=time.monotonic()))
+
+    def run(self) -> None:
+        with ThreadPoolExecutor(max_workers=max(1, len(self._jobs)), thread_name_prefix='scheduler') as executor:
+            while self._jobs and not self._stopped.is_set():
+                now = time.monotonic()
+                for job in self._jobs:
+                    if job.next_run > now:
+                        continue
+                    if job.is_running:
+                        logging.warning(f"{job.name}: the previous execution is still running, skipping this one")
+                    else:
+                        job.future = executor.submit(self._run_job, job)
+                    while job.next_run <= now:
+                        job.next_run += job.interval_seconds
+                self._stopped.wait(min(job.next_run for job in self._jobs) - time.monotonic())
+
+            if any(job.is_running for job in self._jobs):
+                logging.info("Waiting for the running executions to finish")
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    @staticmethod
+    def _run_job(job: ScheduledJob) -> None:
+        logging.info(f"{job.name}: starting")
+        start = time.perf_counter()
+        try:
+            job.func()
+        except Exception:
+            logging.exception(f"{job.name} failed")
+        else:
+            logging.info(f"{job.name}: done in {time.perf_counter() - start:.1f}s")